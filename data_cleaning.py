@@ -1,21 +1,24 @@
+from speedometer.sinks import load_measurements
 import csv
 import glob
 from datetime import datetime
 import os
+import numpy as np
 
 
 def read_data(path: str, extension: str = ".csv"):
     """
     Function reads all data from path, can be single file or directory.
     :param path: str -> Path of file or directory.
-    :param extension: str -> extension type of files to read, preset to .csv files.
+    :param extension: str -> extension type of files to read, preset to .csv files. Files saved by the other sinks of
+    Radar are read without parsing: ".db"(SQLite) or ".cols"(columnar directories).
     :return: list, list(list(), list(),...) -> list containing headers, list containing all data rows as lists.
     """
     paths = []
     # Check if given path is valid.
     if not os.path.exists(path):
         raise ValueError("Given path does not exists: {}".format(path))
-    if os.path.isfile(path):
+    if os.path.isfile(path) or (path.endswith(extension) and extension != ".csv"):
         # If its file, check extension and save to paths
         if path.endswith(extension):
             paths.append(path)
@@ -32,6 +35,11 @@ def read_data(path: str, extension: str = ".csv"):
     header = []
     data_list = []
     for file_path in paths:
+        if extension != ".csv":
+            columns = load_measurements(file_path)
+            header = list(columns.keys())
+            data_list += np.column_stack([values.astype(float) for values in columns.values()]).tolist()
+            continue
         with open(file_path, 'r') as csv_file:
             reader = csv.reader(csv_file)
             ct = 1
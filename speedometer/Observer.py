@@ -41,6 +41,19 @@ class Observer(ABC):
         """
         pass
 
+    def gap(self, frames) -> None:
+        """
+        Receive from subject that frames were missed(stream was reconnecting), does nothing unless overridden
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Receive from subject that playing ended, state that should outlive the process gets saved here, does nothing
+        unless overridden
+        """
+        pass
+
 
 class Mediator(ABC):
     """
@@ -74,4 +87,17 @@ class Mediator(ABC):
         """
         Receive update from subject
         """
-        pass
\ No newline at end of file
+        pass
+
+    def gap(self, frames) -> None:
+        """
+        Receive from subject that frames were missed(stream was reconnecting), does nothing unless overridden
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Receive from subject that playing ended, state that should outlive the process gets saved here, does nothing
+        unless overridden
+        """
+        pass
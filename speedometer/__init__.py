@@ -10,3 +10,5 @@ __js_url__ = None
 from .object_tracking import ObjectTracking
 from .radar import Radar
 from .video import VideoPlayer
+from .runtime import MultiStreamRuntime
+from .pipeline import SharedMemoryPipeline
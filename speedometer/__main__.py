@@ -0,0 +1,7 @@
+"""
+Command line entry point, run: python -m speedometer --help
+"""
+from speedometer.batch import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+File consists of functions used by ObjectTracking for matching tracked objects with detections. The distances between
+all objects and detections are calculated at once in NumPy, assignment is then solved globally over the whole distance
+matrix, so an object can't take a detection that is closer to another object. In crowded scenes candidate pairs can be
+found with a uniform grid(spatial index) instead of the full distance matrix.
+"""
+import numpy as np
+
+
+def distance_matrix(points1, points2) -> np.ndarray:
+    """
+    Calculates Euclidean distances between all pairs of points.
+    :param points1: numpy.ndarray or list -> Points [[x, y], ...] of length n
+    :param points2: numpy.ndarray or list -> Points [[x, y], ...] of length m
+    :return: numpy.ndarray -> Distances of shape (n, m), distances[i, j] is the distance from points1[i] to points2[j]
+    """
+    points1 = np.asarray(points1, dtype=np.float64).reshape(-1, 2)
+    points2 = np.asarray(points2, dtype=np.float64).reshape(-1, 2)
+    diff = points1[:, np.newaxis, :] - points2[np.newaxis, :, :]
+    return np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+
+
+def greedy_pairs(rows, cols, distances, max_matches) -> tuple:
+    """
+    Picks pairs by ascending distance, a pair is skipped if its row or column was already picked.
+    :param rows: numpy.ndarray -> Rows of candidate pairs
+    :param cols: numpy.ndarray -> Columns of candidate pairs
+    :param distances: numpy.ndarray -> Distances of candidate pairs
+    :param max_matches: int -> Maximum possible number of pairs(min(n, m)), stops once reached
+    :return: tuple(numpy.ndarray, numpy.ndarray) -> (rows, columns) of matched pairs
+    """
+    order = np.argsort(distances, kind="stable")
+    rows, cols = rows[order], cols[order]
+    used_rows, used_cols = set(), set()
+    matched = []
+    for k, (row, col) in enumerate(zip(rows.tolist(), cols.tolist())):
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        matched.append(k)
+        if len(matched) == max_matches:
+            break
+    return rows[matched], cols[matched]
+
+
+def greedy_assignment(distances, max_distance) -> tuple:
+    """
+    Pairs rows and columns by ascending distance, the closest pair of all gets matched first, pairs further than
+    max_distance are never matched.
+    :param distances: numpy.ndarray -> Distance matrix of shape (n, m)
+    :param max_distance: int or float -> Maximum distance of a matched pair
+    :return: tuple(numpy.ndarray, numpy.ndarray) -> (rows, columns) of matched pairs
+    """
+    rows, cols = np.nonzero(distances <= max_distance)
+    return greedy_pairs(rows, cols, distances[rows, cols], min(distances.shape))
+
+
+def optimal_assignment(distances, max_distance) -> tuple:
+    """
+    Pairs rows and columns so that as many pairs as possible are within max_distance and the sum of their distances is
+    minimal(Hungarian algorithm), O(n^3) so use greedy_assignment for very busy scenes.
+    :param distances: numpy.ndarray -> Distance matrix of shape (n, m)
+    :param max_distance: int or float -> Maximum distance of a matched pair
+    :return: tuple(numpy.ndarray, numpy.ndarray) -> (rows, columns) of matched pairs
+    """
+    empty = np.array([], dtype=np.intp)
+    if distances.size == 0:
+        return empty, empty
+    transposed = distances.shape[0] > distances.shape[1]  # Algorithm needs rows <= columns
+    costs = distances.T if transposed else distances
+    # Pairs out of range get a cost higher than any set of pairs in range, they get dropped at the end
+    allowed = costs <= max_distance
+    costs = np.where(allowed, costs, (max_distance + 1) * min(costs.shape) + 1)
+    n, m = costs.shape
+    # Potentials u(rows), v(columns), p[j] is the row(from 1) matched to column j, column 0 is a helper
+    u, v = np.zeros(n + 1), np.zeros(m + 1)
+    p, way = np.zeros(m + 1, dtype=np.intp), np.zeros(m + 1, dtype=np.intp)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        min_v = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while p[j0] != 0:
+            used[j0] = True
+            i0 = p[j0]
+            # Update reduced costs of all free columns at once
+            reduced = np.full(m + 1, np.inf)
+            reduced[1:] = costs[i0 - 1] - u[i0] - v[1:]
+            better = ~used & (reduced < min_v)
+            min_v[better] = reduced[better]
+            way[better] = j0
+            free_min_v = np.where(used, np.inf, min_v)
+            j1 = int(np.argmin(free_min_v))
+            delta = free_min_v[j1]
+            u[p[used]] += delta
+            v[used] -= delta
+            min_v[~used] -= delta
+            j0 = j1
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    cols = np.nonzero(p[1:])[0]
+    rows = p[1:][cols] - 1
+    keep = allowed[rows, cols]
+    rows, cols = rows[keep], cols[keep]
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+# Possible assignment methods of ObjectTracking
+assignment_methods = {"greedy": greedy_assignment,
+                      "optimal": optimal_assignment}
+
+
+def grid_pairs(points1, points2, cell_size) -> tuple:
+    """
+    Finds all pairs of points closer than cell_size using a uniform grid: points2 get sorted by grid cell, each point of
+    points1 is only compared with points2 in its own and the 8 neighbouring cells. Cost grows with the number of points
+    close together instead of with n * m.
+    :param points1: numpy.ndarray or list -> Points [[x, y], ...] of length n
+    :param points2: numpy.ndarray or list -> Points [[x, y], ...] of length m
+    :param cell_size: int or float -> Size of grid cells, maximum distance of a pair
+    :return: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray) -> (rows, columns, distances) of pairs
+    """
+    points1 = np.asarray(points1, dtype=np.float64).reshape(-1, 2)
+    points2 = np.asarray(points2, dtype=np.float64).reshape(-1, 2)
+    if not len(points1) or not len(points2):
+        empty = np.array([], dtype=np.intp)
+        return empty, empty, np.array([])
+    cell_size = max(cell_size, 1e-9)
+    cells1 = np.floor(points1 / cell_size).astype(np.int64)
+    cells2 = np.floor(points2 / cell_size).astype(np.int64)
+    # Cell (cx, cy) gets key cx * height + cy, cells are shifted by one so neighbours of all cells have valid keys
+    lowest = np.minimum(cells1.min(axis=0), cells2.min(axis=0)) - 1
+    cells1 -= lowest
+    cells2 -= lowest
+    height = max(cells1[:, 1].max(), cells2[:, 1].max()) + 2
+    keys2 = cells2[:, 0] * height + cells2[:, 1]
+    order = np.argsort(keys2, kind="stable")
+    sorted_keys = keys2[order]
+    # Range of points2 in each neighbouring cell of each point of points1, shape (9, n)
+    offsets = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+    neighbours = (cells1[np.newaxis, :, 0] + offsets[:, 0, np.newaxis]) * height + \
+                 (cells1[np.newaxis, :, 1] + offsets[:, 1, np.newaxis])
+    starts = np.searchsorted(sorted_keys, neighbours, side="left").ravel()
+    counts = np.searchsorted(sorted_keys, neighbours, side="right").ravel() - starts
+    # Expand ranges into candidate pairs
+    rows = np.repeat(np.tile(np.arange(len(points1)), len(offsets)), counts)
+    positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cols = order[np.repeat(starts, counts) + positions]
+    diff = points1[rows] - points2[cols]
+    distances = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+    close = distances <= cell_size
+    return rows[close], cols[close], distances[close]
+
+
+def assign(points1, points2, max_distance, method="greedy", spatial_index=False) -> tuple:
+    """
+    Matches points1(tracked objects) with points2(detections), pairs further than max_distance are never matched.
+    :param points1: numpy.ndarray or list -> Points [[x, y], ...] of length n
+    :param points2: numpy.ndarray or list -> Points [[x, y], ...] of length m
+    :param max_distance: int, float or numpy.ndarray -> Maximum distance of a matched pair, or an array of n maximum
+    distances, one for each point of points1
+    :param method: str -> One of assignment_methods. Preset: "greedy"
+    :param spatial_index: bool -> If candidate pairs should be found with grid_pairs instead of the full distance
+    matrix, faster in crowded scenes where most pairs are far apart. Preset: False
+    :return: tuple(numpy.ndarray, numpy.ndarray) -> (indices of points1, indices of points2) of matched pairs
+    """
+    shape = (len(points1), len(points2))
+    max_distances = np.broadcast_to(np.asarray(max_distance, dtype=np.float64), shape[:1])
+    largest = max_distances.max() if shape[0] else 0
+    if not spatial_index:
+        distances = distance_matrix(points1, points2)
+        if np.ndim(max_distance):
+            distances[distances > max_distances[:, np.newaxis]] = np.inf
+        return assignment_methods[method](distances, largest)
+    rows, cols, distances = grid_pairs(points1, points2, largest)
+    if np.ndim(max_distance):
+        close = distances <= max_distances[rows]
+        rows, cols, distances = rows[close], cols[close], distances[close]
+    if method == "greedy":
+        return greedy_pairs(rows, cols, distances, min(shape))
+    # Pairs that aren't candidates are out of range
+    matrix = np.full(shape, np.inf)
+    matrix[rows, cols] = distances
+    return assignment_methods[method](matrix, largest)
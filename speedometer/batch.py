@@ -0,0 +1,235 @@
+"""
+Offline batch processing of recordings, every recording gets its own VideoPlayer, ObjectTracking and Radar pipeline in
+a process pool. Roi and lines are loaded from saved_data.json, measured data of all recordings gets merged into one csv
+file ordered by time. A single long recording can also be split into time chunks processed in parallel.
+"""
+from speedometer.video import VideoPlayer
+from speedometer.object_tracking import ObjectTracking
+from speedometer.radar import Radar
+from speedometer.helper_functions import open_data_file
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import cv2
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".h264", ".ts")
+
+
+def list_recordings(path, extensions=VIDEO_EXTENSIONS) -> list:
+    """
+    Expands path into a sorted list of recordings, keeping only video files.
+    :param path: str -> File or directory path
+    :param extensions: tuple(str, ...) -> Accepted file extensions
+    :return: list(str, ...)
+    """
+    if os.path.isdir(path):
+        paths = [os.path.join(path, file_name) for file_name in os.listdir(path)]
+    elif os.path.isfile(path):
+        paths = [path]
+    else:
+        raise ValueError("Given path does not exists: {}".format(path))
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(extensions))
+
+
+def process_recording(video_path, out_file, fps=None, minimum_object_size=0, maximum_object_size=100000,
+                      **video_kwargs) -> str:
+    """
+    Runs one pipeline over a single recording in headless mode and saves measured data to out_file. Ran by the workers
+    of the process pool.
+    :param video_path: str -> Path of recording
+    :param out_file: str -> Csv file measured data gets saved to
+    :param fps: int -> Frames Per Second of recording, read from the recording if None
+    :param minimum_object_size: int -> Passed to ObjectTracking
+    :param maximum_object_size: int -> Passed to ObjectTracking
+    :param video_kwargs: Other parameters passed to VideoPlayer
+    :return: str -> out_file
+    """
+    cv2.setNumThreads(1)  # Every worker runs its own pipeline, cv2 threads would only compete for the same cores
+    video = VideoPlayer(video_path, fps=fps, headless=True, **video_kwargs)
+    video.fps = fps  # Reads fps from recording if None
+    ObjectTracking(video, minimum_object_size=minimum_object_size, maximum_object_size=maximum_object_size)
+    Radar(video, load=True, out_file=out_file)
+    video.play()
+    return out_file
+
+
+def process_chunk(video_path, out_file, start_frame, end_frame, warmup_frames, fps, minimum_object_size=0,
+                  maximum_object_size=100000, **video_kwargs) -> str:
+    """
+    Runs one pipeline over frames [start_frame, end_frame) of a recording. Playing starts warmup_frames earlier so the
+    background model learns and objects already on screen get tracked, only objects exiting the timing area inside the
+    chunk get measured, so each object is measured by exactly one chunk.
+    :param video_path: str -> Path of recording
+    :param out_file: str -> Csv file measured data gets saved to
+    :param start_frame: int -> First frame of chunk
+    :param end_frame: int -> Frame after the last frame of chunk
+    :param warmup_frames: int -> Number of frames played before start_frame without measuring
+    :param fps: int -> Frames Per Second of recording
+    :param minimum_object_size: int -> Passed to ObjectTracking
+    :param maximum_object_size: int -> Passed to ObjectTracking
+    :param video_kwargs: Other parameters passed to VideoPlayer
+    :return: str -> out_file
+    """
+    cv2.setNumThreads(1)
+    video = VideoPlayer(video_path, fps=fps, headless=True, **video_kwargs)
+    ObjectTracking(video, minimum_object_size=minimum_object_size, maximum_object_size=maximum_object_size)
+    Radar(video, load=True, out_file=out_file, measurement_window=(start_frame, end_frame))
+    video.play(start_seconds=max(start_frame - warmup_frames, 0) / fps, end_seconds=end_frame / fps)
+    return out_file
+
+
+def merge_measurements(files, out_file, sort_column="end_time") -> int:
+    """
+    Merges csv files written by Radar into one file ordered by sort_column.
+    :param files: list(str, ...) -> Csv files to merge, missing files are skipped
+    :param out_file: str -> Merged csv file
+    :param sort_column: str -> Name of column rows get ordered by
+    :return: int -> Number of merged rows
+    """
+    header = None
+    rows = []
+    for file_path in files:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, 'r', newline="") as csv_file:
+            reader = csv.reader(csv_file)
+            file_header = next(reader, None)
+            if file_header is None:
+                continue
+            header = header or file_header
+            rows += list(reader)
+    if header is None:
+        print("No measured data to merge.")
+        return 0
+    index = header.index(sort_column)
+    rows.sort(key=lambda row: float(row[index]))
+    with open(out_file, 'w', newline="") as csv_file:
+        writer = csv.writer(csv_file, delimiter=',')
+        writer.writerow(header)
+        writer.writerows(rows)
+    return len(rows)
+
+
+def process_recordings(path, out_file, workers=None, extensions=VIDEO_EXTENSIONS, **kwargs) -> int:
+    """
+    Processes all recordings in path in a process pool, one pipeline per recording, merges measured data to out_file.
+    :param path: str -> Recording or directory of recordings
+    :param out_file: str -> Csv file for the merged measured data
+    :param workers: int -> Number of worker processes. Preset: None(number of cpus)
+    :param extensions: tuple(str, ...) -> Accepted file extensions
+    :param kwargs: Parameters passed to process_recording
+    :return: int -> Number of measured objects
+    """
+    if "lines" not in open_data_file().keys():
+        raise ValueError("No lines are saved in saved_data.json, set them with Radar.set_two_distances(save=True).")
+    recordings = list_recordings(path, extensions)
+    if not recordings:
+        print("No recordings found in: {}".format(path))
+        return 0
+    temp_dir = tempfile.mkdtemp(prefix="speedometer_")
+    try:
+        part_files = [os.path.join(temp_dir, "{}.csv".format(i)) for i in range(len(recordings))]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(process_recording, recording, part_file, **kwargs): recording
+                       for recording, part_file in zip(recordings, part_files)}
+            for i, future in enumerate(as_completed(futures), start=1):
+                future.result()  # Raises exceptions from worker
+                print("[{}/{}] Processed: {}".format(i, len(recordings), futures[future]))
+        merged = merge_measurements(part_files, out_file)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("{} measured objects saved to: {}".format(merged, out_file))
+    return merged
+
+
+def process_chunks(video_path, out_file, chunk_seconds=600, warmup_seconds=10, workers=None, fps=None, **kwargs) -> int:
+    """
+    Splits a single recording into time chunks processed in a process pool, merges measured data to out_file.
+    :param video_path: str -> Path of recording
+    :param out_file: str -> Csv file for the merged measured data
+    :param chunk_seconds: int or float -> Length of chunk in seconds. Preset: 600
+    :param warmup_seconds: int or float -> Seconds played before each chunk to warm up the background model, should
+    be longer than the time objects need to pass the timing area. Preset: 10
+    :param workers: int -> Number of worker processes. Preset: None(number of cpus)
+    :param fps: int -> Frames Per Second of recording, read from the recording if None
+    :param kwargs: Parameters passed to process_chunk
+    :return: int -> Number of measured objects
+    """
+    if "lines" not in open_data_file().keys():
+        raise ValueError("No lines are saved in saved_data.json, set them with Radar.set_two_distances(save=True).")
+    cap = cv2.VideoCapture(video_path)
+    if fps is None:
+        fps = int(cap.get(cv2.CAP_PROP_FPS))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total_frames <= 0:
+        raise ValueError("Could not read the number of frames of: {}".format(video_path))
+    chunk_frames = max(int(chunk_seconds * fps), 1)
+    warmup_frames = int(warmup_seconds * fps)
+    # Chunks [start, end), the first frame gets read when playing starts so the first chunk starts at frame 1
+    chunks = [(start, min(start + chunk_frames, total_frames)) for start in range(1, total_frames, chunk_frames)]
+    temp_dir = tempfile.mkdtemp(prefix="speedometer_")
+    try:
+        part_files = [os.path.join(temp_dir, "{}.csv".format(i)) for i in range(len(chunks))]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(process_chunk, video_path, part_file, start, end, warmup_frames, fps,
+                                       **kwargs): (start, end)
+                       for (start, end), part_file in zip(chunks, part_files)}
+            for i, future in enumerate(as_completed(futures), start=1):
+                future.result()  # Raises exceptions from worker
+                print("[{}/{}] Processed frames: {}-{}".format(i, len(chunks), *futures[future]))
+        # Frames are counted from the start of recording in every chunk
+        merged = merge_measurements(part_files, out_file, sort_column="end_frame")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("{} measured objects saved to: {}".format(merged, out_file))
+    return merged
+
+
+def main(argv=None) -> None:
+    """
+    Command line entry point: python -m speedometer batch PATH -o OUT_FILE or
+    python -m speedometer chunks VIDEO_PATH -o OUT_FILE
+    :param argv: list(str, ...) -> Arguments, read from sys.argv if None
+    :return: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m speedometer",
+                                     description="Offline processing of recorded videos, uses roi and lines saved "
+                                                 "in saved_data.json of the current directory.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser("batch", help="Process a recording or folder of recordings in a process pool.")
+    batch.add_argument("path", help="Recording or folder of recordings.")
+    batch.add_argument("-o", "--out-file", default="measured_data.csv", help="Merged csv output file.")
+    batch.add_argument("-j", "--workers", type=int, default=None, help="Number of worker processes.")
+    batch.add_argument("--fps", type=int, default=None, help="Fps of recordings, read from recordings if not set.")
+    batch.add_argument("--min-size", type=int, default=0, help="Minimum object size in px^2.")
+    batch.add_argument("--max-size", type=int, default=100000, help="Maximum object size in px^2.")
+    batch.add_argument("--extensions", default=",".join(VIDEO_EXTENSIONS),
+                       help="Comma separated video file extensions.")
+
+    chunks = subparsers.add_parser("chunks", help="Split a single long recording into chunks processed in a process "
+                                                  "pool.")
+    chunks.add_argument("path", help="Recording.")
+    chunks.add_argument("-o", "--out-file", default="measured_data.csv", help="Merged csv output file.")
+    chunks.add_argument("-j", "--workers", type=int, default=None, help="Number of worker processes.")
+    chunks.add_argument("--fps", type=int, default=None, help="Fps of recording, read from recording if not set.")
+    chunks.add_argument("--min-size", type=int, default=0, help="Minimum object size in px^2.")
+    chunks.add_argument("--max-size", type=int, default=100000, help="Maximum object size in px^2.")
+    chunks.add_argument("--chunk-seconds", type=float, default=600, help="Length of chunks in seconds.")
+    chunks.add_argument("--warmup-seconds", type=float, default=10,
+                        help="Seconds played before each chunk without measuring.")
+
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        process_recordings(args.path, args.out_file, workers=args.workers,
+                           extensions=tuple(args.extensions.split(",")), fps=args.fps,
+                           minimum_object_size=args.min_size, maximum_object_size=args.max_size)
+    elif args.command == "chunks":
+        process_chunks(args.path, args.out_file, chunk_seconds=args.chunk_seconds,
+                       warmup_seconds=args.warmup_seconds, workers=args.workers, fps=args.fps,
+                       minimum_object_size=args.min_size, maximum_object_size=args.max_size)
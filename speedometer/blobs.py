@@ -0,0 +1,73 @@
+"""
+File consists of blob extraction used by ObjectTracking: connected components of a binary mask are found in one
+cv2.connectedComponentsWithStats call, areas, bounding boxes and centroids of all of them come back as NumPy arrays and
+get filtered by size at once instead of looping over contours in Python.
+"""
+import collections
+import cv2
+import numpy as np
+
+# Blobs of a mask, boxes are (x, y, w, h) rows, areas are numbers of pixels, centroids are (x, y) rows
+Blobs = collections.namedtuple("Blobs", ["boxes", "areas", "centroids"])
+
+# Possible morphological cleanups of mask before extraction
+morphology_operations = {"open": (cv2.MORPH_OPEN,),  # Removes noise
+                         "close": (cv2.MORPH_CLOSE,),  # Fills holes and joins parts of objects
+                         "open_close": (cv2.MORPH_OPEN, cv2.MORPH_CLOSE)}
+
+
+def clean_mask(mask, morphology, kernel) -> np.ndarray:
+    """
+    Applies morphological operations to mask.
+    :param mask: numpy.ndarray -> Binary mask
+    :param morphology: str -> One of morphology_operations
+    :param kernel: numpy.ndarray -> Structuring element
+    :return: numpy.ndarray
+    """
+    for operation in morphology_operations[morphology]:
+        mask = cv2.morphologyEx(mask, operation, kernel)
+    return mask
+
+
+def extract_blobs(mask, minimum_size=0, maximum_size=100000, connectivity=8) -> Blobs:
+    """
+    Finds blobs(connected components) in mask whose area is in range (minimum_size, maximum_size).
+    :param mask: numpy.ndarray -> Binary mask
+    :param minimum_size: int -> Blobs with area(px^2) at most this are dropped. Preset: 0
+    :param maximum_size: int -> Blobs with area(px^2) at least this are dropped. Preset: 100000
+    :param connectivity: int -> 8 or 4 connected pixels. Preset: 8
+    :return: Blobs
+    """
+    _, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=connectivity)
+    # Label 0 is background
+    stats, centroids = stats[1:], centroids[1:]
+    areas = stats[:, cv2.CC_STAT_AREA]
+    keep = (areas > minimum_size) & (areas < maximum_size)
+    return Blobs(stats[keep, :4], areas[keep], centroids[keep])
+
+
+def merge_blobs(blobs_list, offsets) -> Blobs:
+    """
+    Merges blobs found in different parts(regions) of an image into one Blobs of the whole image.
+    :param blobs_list: list(Blobs, ...)
+    :param offsets: list(tuple(x, y), ...) -> Upper left corner of the part each Blobs was found in
+    :return: Blobs
+    """
+    boxes = np.concatenate([blobs.boxes + (x, y, 0, 0) for blobs, (x, y) in zip(blobs_list, offsets)])
+    areas = np.concatenate([blobs.areas for blobs in blobs_list])
+    centroids = np.concatenate([blobs.centroids + (x, y) for blobs, (x, y) in zip(blobs_list, offsets)])
+    return Blobs(boxes, areas, centroids)
+
+
+def blob_detections(blobs, offset=(0, 0)) -> np.ndarray:
+    """
+    Converts blobs to detections used by ObjectTracking, center point is the center of bounding box moved by offset.
+    :param blobs: Blobs
+    :param offset: tuple(x, y) -> Upper left corner of roi the mask was made of
+    :return: numpy.ndarray -> Detections of shape (n, 6), rows are (x, y, w, h, cx, cy)
+    """
+    detections = np.empty((len(blobs.boxes), 6), dtype=np.int64)
+    detections[:, :4] = blobs.boxes
+    detections[:, 4] = blobs.boxes[:, 0] + offset[0] + blobs.boxes[:, 2] // 2
+    detections[:, 5] = blobs.boxes[:, 1] + offset[1] + blobs.boxes[:, 3] // 2
+    return detections
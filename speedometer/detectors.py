@@ -0,0 +1,253 @@
+"""
+File consists of detector backends used by ObjectTracking to find moving pixels. Every detector turns an image of roi into
+a binary mask(255 moving, 0 background) and keeps track of its cost, time spent per frame, so the cheapest detector that
+is accurate enough for a scene can be picked(frame difference on a Raspberry Pi, MOG2 on a desktop, ...).
+Detectors are registered by name in detectors, new ones can be added with register_detector.
+"""
+import time
+import cv2
+
+
+class Detector:
+    """
+    Base class of detectors, subclasses implement _apply.
+    """
+    supports_shadows = False  # If detect_shadows can be set, shadows only work on colour images
+
+    def __init__(self):
+        self.frames = 0  # Number of frames detection ran on
+        self.total_time = 0.0  # Seconds spent detecting
+
+    def apply(self, image):
+        """
+        Detects moving pixels in image and measures the time it took.
+        :param image: numpy.ndarray -> BGR or single channel image
+        :return: numpy.ndarray -> Binary mask
+        """
+        start_time = time.perf_counter()
+        mask = self._apply(image)
+        self.total_time += time.perf_counter() - start_time
+        self.frames += 1
+        return mask
+
+    def _apply(self, image):
+        raise NotImplementedError
+
+    @property
+    def cost(self) -> float:
+        """
+        Average time of detection in milliseconds per frame, None if detection didn't run yet.
+        """
+        if not self.frames:
+            return None
+        return self.total_time / self.frames * 1000
+
+    def reset_cost(self) -> None:
+        self.frames = 0
+        self.total_time = 0.0
+
+    def background(self):
+        """
+        Returns the learned background image, used to save the model between runs.
+        :return: numpy.ndarray or None if nothing was learned yet
+        """
+        return None
+
+    def restore(self, background) -> None:
+        """
+        Starts the model from a background image returned by background, so detection works from the first frame.
+        :param background: numpy.ndarray
+        :return: None
+        """
+        pass
+
+    @staticmethod
+    def gray(image):
+        """
+        Converts BGR image to grayscale, single channel images are returned as they are.
+        """
+        if image.ndim == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    def __repr__(self) -> str:
+        cost = "{:.3f} ms/frame".format(self.cost) if self.frames else "not measured"
+        return "{}(cost: {})".format(type(self).__name__, cost)
+
+
+class MOG2Detector(Detector):
+    """
+    Gaussian mixture background model(cv2.createBackgroundSubtractorMOG2), accurate but the most expensive.
+    """
+    supports_shadows = True
+
+    def __init__(self, history=100, var_threshold=50, detect_shadows=True):
+        """
+        :param history: int -> Number of frames the background model learns from. Preset: 100
+        :param var_threshold: float -> Threshold of the distance from background model. Preset: 50
+        :param detect_shadows: bool -> If shadows should be detected and left out of mask. Preset: True
+        """
+        super().__init__()
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(history=history, varThreshold=var_threshold,
+                                                             detectShadows=detect_shadows)
+
+    def _apply(self, image):
+        mask = self.subtractor.apply(image)
+        # Shadows are marked with 127, only keep foreground
+        _, mask = cv2.threshold(mask, 254, 255, cv2.THRESH_BINARY)
+        return mask
+
+    def background(self):
+        return self.subtractor.getBackgroundImage() if self.frames else None
+
+    def restore(self, background) -> None:
+        # Model learns from the background as if it was seen for a whole history, a single frame is not trusted yet
+        for _ in range(self.subtractor.getHistory()):
+            self.subtractor.apply(background)
+
+
+class KNNDetector(Detector):
+    """
+    K-nearest neighbours background model(cv2.createBackgroundSubtractorKNN), usually cheaper than MOG2 when there are
+    few moving pixels.
+    """
+    supports_shadows = True
+
+    def __init__(self, history=100, dist2_threshold=400, detect_shadows=True):
+        """
+        :param history: int -> Number of frames the background model learns from. Preset: 100
+        :param dist2_threshold: float -> Threshold of the squared distance from background samples. Preset: 400
+        :param detect_shadows: bool -> If shadows should be detected and left out of mask. Preset: True
+        """
+        super().__init__()
+        self.subtractor = cv2.createBackgroundSubtractorKNN(history=history, dist2Threshold=dist2_threshold,
+                                                            detectShadows=detect_shadows)
+
+    def _apply(self, image):
+        mask = self.subtractor.apply(image)
+        _, mask = cv2.threshold(mask, 254, 255, cv2.THRESH_BINARY)
+        return mask
+
+    def background(self):
+        return self.subtractor.getBackgroundImage() if self.frames else None
+
+    def restore(self, background) -> None:
+        for _ in range(self.subtractor.getHistory()):
+            self.subtractor.apply(background)
+
+
+class BgsegmDetector(Detector):
+    """
+    Background subtractors from the opencv-contrib bgsegm module("MOG", "GMG").
+    """
+    def __init__(self, method="MOG"):
+        """
+        :param method: str -> "MOG"(preset) or "GMG"
+        """
+        super().__init__()
+        if not hasattr(cv2, "bgsegm"):
+            raise ValueError("Detector {} needs the bgsegm module of opencv-contrib-python.".format(method))
+        if method == "MOG":
+            self.subtractor = cv2.bgsegm.createBackgroundSubtractorMOG()
+        elif method == "GMG":
+            self.subtractor = cv2.bgsegm.createBackgroundSubtractorGMG()
+        else:
+            raise ValueError("Bgsegm method set incorrectly. Should be one of: MOG, GMG")
+
+    def _apply(self, image):
+        mask = self.subtractor.apply(image)
+        _, mask = cv2.threshold(mask, 254, 255, cv2.THRESH_BINARY)
+        return mask
+
+
+class FrameDifferenceDetector(Detector):
+    """
+    Difference between the current and previous grayscale frame, the cheapest detector. Has no background model, so it
+    needs no warm up, but only edges of objects with uniform colour move between frames, dilation fills them up.
+    """
+    def __init__(self, threshold=25, dilate_iterations=2):
+        """
+        :param threshold: int -> Minimum difference(0-255) of a moving pixel. Preset: 25
+        :param dilate_iterations: int -> Number of 3x3 dilations applied to mask. Preset: 2
+        """
+        super().__init__()
+        self.threshold = threshold
+        self.dilate_iterations = dilate_iterations
+        self.prev_frame = None
+
+    def _apply(self, image):
+        gray = self.gray(image)
+        if self.prev_frame is None or self.prev_frame.shape != gray.shape:
+            self.prev_frame = gray.copy()
+        mask = cv2.absdiff(self.prev_frame, gray)
+        self.prev_frame = gray.copy()  # Image can be a view of a frame that gets drawn on or reused
+        _, mask = cv2.threshold(mask, self.threshold, 255, cv2.THRESH_BINARY)
+        if self.dilate_iterations:
+            mask = cv2.dilate(mask, None, iterations=self.dilate_iterations)
+        return mask
+
+
+class RunningAverageDetector(Detector):
+    """
+    Difference between the grayscale frame and a running average of previous frames(cv2.accumulateWeighted), almost as
+    cheap as frame difference but detects whole objects.
+    """
+    def __init__(self, alpha=0.05, threshold=25, dilate_iterations=1):
+        """
+        :param alpha: float -> Weight of the current frame in background, bigger adapts faster. Preset: 0.05
+        :param threshold: int -> Minimum difference(0-255) of a moving pixel. Preset: 25
+        :param dilate_iterations: int -> Number of 3x3 dilations applied to mask. Preset: 1
+        """
+        super().__init__()
+        self.alpha = alpha
+        self.threshold = threshold
+        self.dilate_iterations = dilate_iterations
+        self._background = None  # float32 image
+
+    def _apply(self, image):
+        gray = self.gray(image)
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype("float32")
+        mask = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        cv2.accumulateWeighted(gray, self._background, self.alpha)
+        _, mask = cv2.threshold(mask, self.threshold, 255, cv2.THRESH_BINARY)
+        if self.dilate_iterations:
+            mask = cv2.dilate(mask, None, iterations=self.dilate_iterations)
+        return mask
+
+    def background(self):
+        return cv2.convertScaleAbs(self._background) if self._background is not None else None
+
+    def restore(self, background) -> None:
+        self._background = self.gray(background).astype("float32")
+
+
+# Registered detectors, name: class or function returning a Detector
+detectors = {"MOG2": MOG2Detector,
+             "KNN": KNNDetector,
+             "MOG": lambda **kwargs: BgsegmDetector("MOG", **kwargs),
+             "GMG": lambda **kwargs: BgsegmDetector("GMG", **kwargs),
+             "frame_difference": FrameDifferenceDetector,
+             "running_average": RunningAverageDetector}
+
+
+def register_detector(name, detector) -> None:
+    """
+    Registers a detector so it can be used by ObjectTracking(bkg_subtractor=name).
+    :param name: str -> Name of detector
+    :param detector: class or function -> Returns a Detector when called with detector parameters
+    :return: None
+    """
+    detectors[name] = detector
+
+
+def create_detector(name, **kwargs) -> Detector:
+    """
+    Creates a registered detector.
+    :param name: str -> Name of detector
+    :param kwargs: Parameters of detector
+    :return: Detector
+    """
+    if name not in detectors:
+        raise ValueError("Detector set incorrectly. Should be one of: {}".format(", ".join(detectors)))
+    return detectors[name](**kwargs)
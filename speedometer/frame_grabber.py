@@ -0,0 +1,123 @@
+"""
+File consists of the FrameGrabber class, which reads frames from a capture on its own thread into a bounded buffer.
+"""
+import collections
+import threading
+
+# Frame read by the grabber, timestamp is the capture time of frame given by the source, gap is the number of frames
+# missed(stream reconnecting) before this frame
+GrabbedFrame = collections.namedtuple("GrabbedFrame", ["frame_number", "timestamp", "frame", "gap"])
+
+
+class FrameGrabber:
+    """
+    FrameGrabber reads frames from a StreamSource on a dedicated thread and keeps them in a bounded ring buffer. Every
+    frame gets numbered as it is read, frames missed while the stream was reconnecting are counted too, so frame numbers
+    stay correct even when frames get dropped from the buffer.
+    Possible policies when the buffer is full:
+        - "drop_oldest": oldest buffered frame is dropped, used for live streams so processing runs on fresh frames.
+        - "block": reader thread waits until there is space in buffer, used for files so no frame gets lost.
+    """
+    policies = ("drop_oldest", "block")
+
+    def __init__(self, cap, buffer_size=2, policy="drop_oldest", start_frame=0):
+        """
+        :param cap: StreamSource -> Opened capture to read frames from.
+        :param buffer_size: int -> Maximum number of frames kept in buffer. Preset: 2
+        :param policy: str -> What happens when buffer is full, possible: "drop_oldest"(preset), "block"
+        :param start_frame: int -> Frame number of the last frame read before the grabber was started.
+        """
+        if policy not in self.policies:
+            raise ValueError("Buffer policy set incorrectly. Should be one of: {}".format(", ".join(self.policies)))
+        if buffer_size < 1:
+            raise ValueError("Buffer size should be at least 1.")
+        self.cap = cap
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self._frame_number = start_frame  # Number of the last read frame
+        self._buffer = collections.deque()  # [GrabbedFrame, ...]
+        self._dropped_gap = 0  # Gap of dropped frames, gets added to the next buffered frame
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._finished = False  # Set once the capture has no more frames
+        # Counters
+        self.grabbed_frames = 0  # All frames read from capture
+        self.dropped_frames = 0  # Frames dropped from the buffer before they got processed
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def queued_frames(self) -> int:
+        """
+        Number of frames currently waiting in buffer.
+        """
+        with self._condition:
+            return len(self._buffer)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Starts the reader thread
+        """
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the reader thread, waits for it to finish, frames left in the buffer are discarded.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self) -> None:
+        """
+        Reader thread, reads frames until stopped or until the capture runs out of frames.
+        """
+        while not self._stopped:
+            ret, frame = self.cap.read()
+            if not ret:  # End of video or stream closed
+                break
+            gap = self.cap.pop_gap()
+            self._frame_number += 1 + gap
+            self.grabbed_frames += 1
+            with self._condition:
+                if self.policy == "block":
+                    while len(self._buffer) >= self.buffer_size and not self._stopped:
+                        self._condition.wait()
+                elif len(self._buffer) >= self.buffer_size:  # drop_oldest
+                    # Gap is reported with the next frame, so observers still learn about it
+                    self._dropped_gap += self._buffer.popleft().gap
+                    self.dropped_frames += 1
+                self._buffer.append(GrabbedFrame(self._frame_number, self.cap.timestamp, frame,
+                                                 gap + self._dropped_gap))
+                self._dropped_gap = 0
+                self._condition.notify_all()
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def read(self, timeout=None):
+        """
+        Returns the oldest buffered frame, waits for one if the buffer is empty.
+        :param timeout: float -> Maximum number of seconds to wait for a frame, waits forever if None.
+        :return: GrabbedFrame -> (frame_number, timestamp, frame, gap) or None if there are no more frames(or timed out)
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._buffer or self._finished or self._stopped, timeout):
+                return None
+            if not self._buffer:
+                return None
+            item = self._buffer.popleft()
+            self._condition.notify_all()  # Wake reader if it is blocking on a full buffer
+            return item
+
+    def release(self) -> None:
+        """
+        Stops the reader and releases capture
+        """
+        self.stop()
+        self.cap.release()
@@ -5,26 +5,28 @@ import json
 import math
 
 
-def open_data_file():
+def open_data_file(data_file="saved_data.json"):
     """ Opens the saved_data.json returns the dic.
+    :param data_file: str -> Path of the json file. Preset: "saved_data.json"
     :return: dict()
     """
-    with open("saved_data.json", 'r') as glob:
+    with open(data_file, 'r') as glob:
         data = json.load(glob)
     return data
 
 
-def save_to_data_file(dict):
+def save_to_data_file(dict, data_file="saved_data.json"):
     """ Saves the keys and values from dict to saved_data.json
     :param dict: dict() containing key, value pairs
+    :param data_file: str -> Path of the json file. Preset: "saved_data.json"
     """
-    with open("saved_data.json", 'r') as glob:
+    with open(data_file, 'r') as glob:
         data = json.load(glob)
 
     for key, value in dict.items():
         data[key] = value
 
-    with open("saved_data.json", 'w') as glob:
+    with open(data_file, 'w') as glob:
         json.dump(data, glob)
 
 
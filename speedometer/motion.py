@@ -0,0 +1,126 @@
+"""
+File consists of motion models used by ObjectTracking to predict where tracked objects are in the current frame. Objects
+get matched with detections near their predicted positions instead of their last positions, so the matching distance can
+be small even when objects move fast, frames are skipped(stride) or an object wasn't detected in some frames(coasting).
+Velocities are in pixels per frame, state of each object is kept in Object.state.
+"""
+import numpy as np
+
+
+class ConstantVelocity:
+    """
+    Velocity of object is the smoothed difference between its last two center points divided by the frames between them.
+    """
+    def __init__(self, smoothing=0.5):
+        """
+        :param smoothing: float -> Weight of the previous velocity when a new one is measured, 0 uses only the last
+        measured velocity. Preset: 0.5
+        """
+        if not 0 <= smoothing < 1:
+            raise ValueError("Smoothing should be in range [0, 1).")
+        self.smoothing = smoothing
+
+    def init(self, obj) -> None:
+        """
+        Sets state of a newly created object, velocity is unknown.
+        :param obj: Object
+        :return: None
+        """
+        obj.state = None
+
+    def has_velocity(self, obj) -> bool:
+        return obj.state is not None
+
+    def predict(self, objects, frame) -> np.ndarray:
+        """
+        Predicts center points of objects at frame.
+        :param objects: list(Object, ...)
+        :param frame: int -> Frame number
+        :return: numpy.ndarray -> Predicted points of shape (len(objects), 2)
+        """
+        centers = np.array([obj.last_center_point for obj in objects], dtype=np.float64).reshape(-1, 2)
+        velocities = np.array([obj.state if obj.state is not None else (0, 0) for obj in objects],
+                              dtype=np.float64).reshape(-1, 2)
+        frames = np.array([frame - obj.last_frame for obj in objects], dtype=np.float64)
+        return centers + velocities * frames[:, np.newaxis]
+
+    def update(self, obj) -> None:
+        """
+        Updates velocity of object after a detection was added to it.
+        :param obj: Object
+        :return: None
+        """
+        frame1, _, (x1, y1) = obj.point(-2)
+        frame2, _, (x2, y2) = obj.point(-1)
+        frames = frame2 - frame1
+        velocity = np.array([(x2 - x1) / frames, (y2 - y1) / frames])
+        if obj.state is None:
+            obj.state = velocity
+        else:
+            obj.state = self.smoothing * obj.state + (1 - self.smoothing) * velocity
+
+
+class Kalman:
+    """
+    Kalman filter with a constant velocity model, state of object is (x, y, vx, vy) and its covariance. Noisy
+    detections(blobs changing shape) get smoothed, velocity adapts based on how much the detections can be trusted.
+    """
+    def __init__(self, process_noise=1.0, measurement_noise=4.0, velocity_variance=100.0):
+        """
+        :param process_noise: float -> Variance of acceleration(px^2 per frame) of objects. Preset: 1.0
+        :param measurement_noise: float -> Variance of detected center points(px^2). Preset: 4.0
+        :param velocity_variance: float -> Variance of the unknown velocity of new objects. Preset: 100.0
+        """
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.velocity_variance = velocity_variance
+        self.H = np.array([[1., 0., 0., 0.], [0., 1., 0., 0.]])  # Only the position is measured
+
+    def init(self, obj) -> None:
+        """
+        Sets state of a newly created object, position is the detection, velocity is unknown.
+        :param obj: Object
+        :return: None
+        """
+        x, y = obj.last_center_point
+        covariance = np.diag([self.measurement_noise, self.measurement_noise,
+                              self.velocity_variance, self.velocity_variance])
+        obj.state = (np.array([x, y, 0., 0.]), covariance)
+
+    def has_velocity(self, obj) -> bool:
+        return obj.num_of_points >= 2
+
+    def predict(self, objects, frame) -> np.ndarray:
+        """
+        Predicts center points of objects at frame.
+        :param objects: list(Object, ...)
+        :param frame: int -> Frame number
+        :return: numpy.ndarray -> Predicted points of shape (len(objects), 2)
+        """
+        states = np.array([obj.state[0] for obj in objects], dtype=np.float64).reshape(-1, 4)
+        frames = np.array([frame - obj.last_frame for obj in objects], dtype=np.float64)
+        return states[:, :2] + states[:, 2:] * frames[:, np.newaxis]
+
+    def update(self, obj) -> None:
+        """
+        Predicts state of object to the frame of its last detection and corrects it with the detection.
+        :param obj: Object
+        :return: None
+        """
+        frames = obj.last_frame - obj.point(-2)[0]
+        state, covariance = obj.state
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = frames
+        # Acceleration noise over the frames since the last detection
+        G = np.array([[frames ** 2 / 2, 0.], [0., frames ** 2 / 2], [frames, 0.], [0., frames]])
+        state = F @ state
+        covariance = F @ covariance @ F.T + G @ G.T * self.process_noise
+        residual = np.asarray(obj.last_center_point, dtype=np.float64) - self.H @ state
+        S = self.H @ covariance @ self.H.T + np.eye(2) * self.measurement_noise
+        K = covariance @ self.H.T @ np.linalg.inv(S)
+        obj.state = (state + K @ residual, (np.eye(4) - K @ self.H) @ covariance)
+
+
+# Possible motion models of ObjectTracking
+motion_models = {"constant_velocity": ConstantVelocity,
+                 "kalman": Kalman}
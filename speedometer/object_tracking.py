@@ -1,99 +1,167 @@
 from speedometer.Observer import Mediator, Observer
-from speedometer.helper_functions import euclid_dist
+from speedometer.assignment import assign, assignment_methods
+from speedometer.motion import motion_models
+from speedometer.detectors import Detector, detectors, create_detector
+from speedometer.blobs import extract_blobs, blob_detections, merge_blobs, clean_mask, morphology_operations
+from speedometer.regions import Region
+import collections
+import os
 import time
 import numpy as np
 
 
+# Changes of tracked objects in one frame, emitted by ObjectTracking. created are new objects, updated are objects
+# matched with a detection(new position), lost are objects that stopped being tracked. Only changed objects are in it,
+# observers work on these instead of scanning all tracked objects every frame.
+TrackEvents = collections.namedtuple("TrackEvents", ["frame", "created", "updated", "lost"])
+
+
 class Object:
     """
     Represents one object that is being tracked. Keeps track of positions, bounding rect. sizes,
     Unix times of detections and frame, numbers of detections.
+    Only the last max_history detections are kept, in preallocated NumPy ring buffers, size and direction are kept as
+    running aggregates over all detections. Memory of an object stays the same however long it is tracked and adding a
+    point is O(1).
     """
-    def __init__(self, id, frame, position, bounding_rect, center_point):
+    __slots__ = ("id", "num_of_points", "max_history", "_frames", "_times", "_positions", "_bounding_rects",
+                 "_center_points", "_size_sum", "first_center_point", "still_points", "state")
+
+    def __init__(self, id, frame, position, bounding_rect, center_point, timestamp=None, max_history=100):
         """
         :param id: int -> Unique id of object.
         :param frame: int -> Frame number of video as the object gets initialized.
         :param position: list or tuple -> Position of object as a point(x, y) as it gets initialized.
         :param bounding_rect: list or tuple -> Size of the bounding rectangle of object as a pair(width, height)
         :param center_point: list or tuple -> Center point of object as a point(x, y)
+        :param timestamp: float -> Unix time the frame was captured at, current time if None
+        :param max_history: int -> Number of last detections kept. Preset: 100
         """
+        if max_history < 2:
+            raise ValueError("Max history should be at least 2.")
         self.id = id
-        self.num_of_points = 1  # Number of points (adds one when initialized)
-        # List off all center positions of object (center of rectangle)
-        self.positions = []  # [[x1, y1], ...] upper left corner positions of bounding rect
-        self.positions.append(position)
-        # List of all bounding rectangles sizes
-        self.bounding_rects = []  # [[w1, h1], ...]
-        self.bounding_rects.append(bounding_rect)
-        # List of frame counter the object was seen
-        self.frames = []  # [int_1, ...]
-        self.frames.append(frame)
-        # Calculate center position and save to list
-        self.center_points = []
-        self.center_points.append(center_point)
-        # Times get measured in case fps doesn't match up
-        self.times = []
-        self.times.append(time.time())
-
-    def add_point(self, frame, position, bounding_rect, center_point) -> None:
-        """
-        Method adds a detected point to the object
-        """
-        self.frames.append(frame)  # Frame of detection
-        self.positions.append(position)  # Position of detection
-        self.bounding_rects.append(bounding_rect)  # Size at detection
-        self.center_points.append(center_point)
-        self.times.append(time.time())
+        self.num_of_points = 0  # Number of all points, also the ones no longer in history
+        self.max_history = max_history
+        # Ring buffers, point i is at index i % max_history
+        self._frames = np.empty(max_history, dtype=np.int64)  # Frame counter the object was seen
+        self._times = np.empty(max_history, dtype=np.float64)  # Times get measured in case fps doesn't match up
+        self._positions = np.empty((max_history, 2), dtype=np.int64)  # Upper left corner positions of bounding rect
+        self._bounding_rects = np.empty((max_history, 2), dtype=np.int64)  # Bounding rectangle sizes (w, h)
+        self._center_points = np.empty((max_history, 2), dtype=np.int64)  # Center of bounding rect
+        # Running aggregates
+        self._size_sum = 0  # Sum of bounding rect. surfaces
+        self.first_center_point = (int(center_point[0]), int(center_point[1]))
+        self.still_points = 0  # Number of consecutive points at the same center point as the one before
+        self.state = None  # State of object kept by the motion model of tracker(velocity, ...)
+        self.add_point(frame, position, bounding_rect, center_point, timestamp)
+
+    def add_point(self, frame, position, bounding_rect, center_point, timestamp=None) -> None:
+        """
+        Method adds a detected point to the object, timestamp is the capture time of frame(current time if None)
+        """
+        center_point = (int(center_point[0]), int(center_point[1]))
+        if self.num_of_points and center_point == self.last_center_point:
+            self.still_points += 1
+        else:
+            self.still_points = 0
+        i = self.num_of_points % self.max_history
+        self._frames[i] = frame  # Frame of detection
+        self._times[i] = time.time() if timestamp is None else timestamp
+        self._positions[i] = position[0:2]  # Position of detection
+        self._bounding_rects[i] = bounding_rect[0:2]  # Size at detection
+        self._center_points[i] = center_point
+        self._size_sum += int(bounding_rect[0]) * int(bounding_rect[1])
         self.num_of_points += 1
 
+    def _index(self, index) -> int:
+        """
+        Converts index of point in history to index in ring buffers.
+        :param index: int -> Negative index, -1 is the last point
+        :return: int
+        """
+        if not -min(self.num_of_points, self.max_history) <= index < 0:
+            raise IndexError("Point {} is not in history of object.".format(index))
+        return (self.num_of_points + index) % self.max_history
+
+    def point(self, index=-1) -> tuple:
+        """
+        Returns a point from history.
+        :param index: int -> Negative index, -1 is the last point. Preset: -1
+        :return: tuple(frame, time, center_point)
+        """
+        i = self._index(index)
+        return int(self._frames[i]), float(self._times[i]), tuple(self._center_points[i].tolist())
+
+    @property
+    def last_frame(self) -> int:
+        return int(self._frames[(self.num_of_points - 1) % self.max_history])
+
+    @property
+    def last_time(self) -> float:
+        return float(self._times[(self.num_of_points - 1) % self.max_history])
+
+    @property
+    def last_center_point(self) -> tuple:
+        return tuple(self._center_points[(self.num_of_points - 1) % self.max_history].tolist())
+
+    def _ordered(self, buffer) -> np.ndarray:
+        """
+        Returns history in buffer ordered from the oldest to the last point.
+        :param buffer: numpy.ndarray -> One of the ring buffers
+        :return: numpy.ndarray
+        """
+        if self.num_of_points <= self.max_history:
+            return buffer[:self.num_of_points].copy()
+        i = self.num_of_points % self.max_history
+        return np.concatenate((buffer[i:], buffer[:i]))
+
+    @property
+    def frames(self) -> np.ndarray:
+        return self._ordered(self._frames)
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._ordered(self._times)
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._ordered(self._positions)
+
+    @property
+    def bounding_rects(self) -> np.ndarray:
+        return self._ordered(self._bounding_rects)
+
+    @property
+    def center_points(self) -> np.ndarray:
+        return self._ordered(self._center_points)
+
     def average_size(self) -> float:
         """
         Function returns the average size of the object
         :return: float: average size(by surface)
         """
-        return int(sum([rect[0] * rect[1] for rect in self.bounding_rects])/self.num_of_points)
+        return int(self._size_sum / self.num_of_points)
 
     def direction(self) -> tuple:
         """
         Method calculates the direction of object by the first and last center points of object.
         :return: tuple(x, y) -> where x, y are direction values, ether 1(positive), 0(not moving), -1(negative)
         """
-        last_pos = self.center_points[-1]
-        first_pos = self.center_points[0]
-        # Readability counts or smthin
-        # Set direction in x
-        x_diff = last_pos[0] - first_pos[0]
-        if x_diff > 0:
-            x_dir = 1
-        elif x_diff == 0:
-            x_dir = 0
-        else:
-            x_dir = -1
-        # Set direction in y
-        y_diff = last_pos[1] - first_pos[1]
-        if y_diff > 0:
-            y_dir = 1
-        elif y_diff == 0:
-            y_dir = 0
-        else:
-            y_dir = -1
+        last_pos = self.last_center_point
+        first_pos = self.first_center_point
+        x_dir = int(np.sign(last_pos[0] - first_pos[0]))
+        y_dir = int(np.sign(last_pos[1] - first_pos[1]))
         return x_dir, y_dir
 
     def average_direction(self) -> tuple:
         """
-        Method calculates the average movement vector between two consecutive points.
+        Method calculates the average movement vector between two consecutive points, differences between consecutive
+        points sum up to the difference between the last and first point.
         :return: tuple(x, y) -> average direction in the x and y coordinates of the center point of object
         """
-        x_diff, y_diff = [], []
-        prev_x, prev_y = self.center_points[0]
-        for i in range(1, self.num_of_points):
-            curr_pos = self.center_points[i]
-            # Append difference to prev. point
-            x_diff.append(curr_pos[0] - prev_x)
-            y_diff.append(curr_pos[1] - prev_y)
-            # Set this point as previous
-            x_diff, y_diff = curr_pos
-        return sum(x_diff)/self.num_of_points, sum(y_diff)/self.num_of_points
+        last_pos = self.last_center_point
+        first_pos = self.first_center_point
+        return (last_pos[0] - first_pos[0]) / self.num_of_points, (last_pos[1] - first_pos[1]) / self.num_of_points
 
     def __repr__(self) -> str:
         """
@@ -101,7 +169,7 @@ class Object:
         :return: str
         """
         string = "Object(id: {}, center_pos: {}, num_of_points: {})".format(self.id,
-                                                                            self.center_points[-1],
+                                                                            self.last_center_point,
                                                                             self.num_of_points)
         return string
 
@@ -112,28 +180,75 @@ class ObjectTracking(Mediator):
     Acts as a mediator between the VideoPlayer object and Timer object, wraps VideoPlayer and is wrapped by Timer.
     """
     def __init__(self, video, bkg_subtractor="MOG2", tracking="euclid", min_frame_diff=None, max_point_distance=None, display=True,
-                 minimum_object_size=0, maximum_object_size=100000):
+                 minimum_object_size=0, maximum_object_size=100000, channel=None, assignment="greedy",
+                 spatial_index=False, motion_model=None, prediction_distance=None, max_history=100,
+                 detector_params=None, morphology=None, morphology_kernel=3, background_file=None,
+                 background_save_interval=60, regions=None):
         """
         :param video: VideoPlayer object -> Is necessary as this class wraps it.
-        :param bkg_subtractor: str -> Type of background subtractor to use possible: "MOG", "MOG2"(preset), "GMG"
+        :param bkg_subtractor: str or Detector -> Detector finding moving pixels, name of a registered detector(see
+        detectors.detectors) possible: "MOG2"(preset), "KNN", "frame_difference", "running_average", "MOG", "GMG" or a
+        Detector object
         :param tracking: str -> Type of object tracking to use. Possible: "euclid"(preset)
         :param object_parameters: dict -> Dict consisting of possible object size pairs object_name: [min_size, max_size]
         :param min_frame_diff: int or float -> The minimal frame number an object can stand still(preset=20% of video fps)
         :param max_point_distance: int or float -> The maximum distance(px) an object can travel between two frames
-        :param display: bool -> If the mask video should be displayed at each frame. Preset: True
+        :param display: bool -> If the mask video should be displayed at each frame, never displayed if video is
+        headless. Preset: True
+        :param channel: str or int -> Image channel detection runs on, possible: None(all 3 BGR channels, preset),
+        'gray'(converted to grayscale once per frame), 0, 1 or 2(single B, G or R channel). The colour frame is only
+        used for drawing/displaying.
+        :param assignment: str -> How tracked objects get matched with detections, possible: "greedy"(closest pairs of
+        all get matched first, preset), "optimal"(minimal sum of distances, slower for many objects)
+        :param spatial_index: bool -> If objects should only be compared with detections in neighbouring cells of a grid
+        with cell size max_point_distance, rebuilt every frame. Faster when there are many blobs. Preset: False
+        :param motion_model: str or None -> Motion model predicting positions of objects, possible: None(last position
+        of object, preset), "constant_velocity", "kalman". Objects get matched near their predicted positions and keep
+        moving along their velocity in frames they weren't detected in(up to min_frame_diff frames).
+        :param prediction_distance: int or float -> The maximum distance(px) between a detection and the predicted
+        position of an object with known velocity, grows with the square root of frames since the object was seen.
+        Only used with motion_model. Preset: None(25% of max_point_distance)
+        :param max_history: int -> Number of last detections kept by each tracked object. Preset: 100
+        :param detector_params: dict -> Parameters passed to the detector if it is given by name. Preset: None
+        :param morphology: str or None -> Cleanup of mask before blobs get extracted, possible: None(preset), "open"
+        (removes noise), "close"(fills holes, joins parts of objects), "open_close"
+        :param morphology_kernel: int -> Size of the square kernel used by morphology. Preset: 3
+        :param background_file: str -> Image file(.png) the learned background gets saved to periodically and when
+        playing ends, and restored from at startup, so detection works from the first frame. Preset: None(not saved)
+        :param background_save_interval: float -> Seconds between saves of background, None only saves when playing
+        ends. Preset: 60
+        :param regions: list(int, ...) -> Indices of video.regions(polygons) detection runs in, every region gets its
+        own detector which only runs on the bounding box of region, pixels outside of polygon are never detected.
+        Regions shouldn't overlap. Preset: None(all regions of video, whole roi if video has no regions)
         """
         self._observers: list = []
         self.video = video  # Video object acts as subject
         self.cv2 = video.cv2  # Match the cv2 module with Video object
         self.bkg_subtractor = None
+        self.channel = channel
+        self.assignment = assignment
+        self.spatial_index = spatial_index
+        self.max_history = max_history
+        if motion_model is not None and motion_model not in motion_models:
+            raise ValueError("Motion model set incorrectly. Should be one of: None, {}".format(", ".join(motion_models)))
+        self.motion_model = motion_models[motion_model]() if motion_model is not None else None
 
         # Set type of background subtraction
-        if bkg_subtractor == "MOG2":
-            self.bkg_subtractor = self.video.cv2.createBackgroundSubtractorMOG2(history=100, varThreshold=50)
-        elif bkg_subtractor == "MOG":
-            self.bkg_subtractor = self.video.cv2.bgsegm.createBackgroundSubtractorMOG()
-        elif bkg_subtractor == "GMG":
-            self.bkg_subtractor = self.video.cv2.createBackgroundSubtractorGMG()
+        if isinstance(bkg_subtractor, Detector):
+            self.bkg_subtractor = bkg_subtractor
+            self._detector_spec = None  # More detectors(regions) can't be created from an instance
+        else:
+            detector_params = dict(detector_params or {})
+            if getattr(detectors.get(bkg_subtractor), "supports_shadows", False):
+                # Shadows can only be told apart in colour, on a single channel every darker object would be a shadow
+                detector_params.setdefault("detect_shadows", self.channel is None)
+            self._detector_spec = (bkg_subtractor, detector_params)
+            self.bkg_subtractor = create_detector(bkg_subtractor, **detector_params)
+        # Regions detection runs in, [(Region, Detector), ...], region is None for the whole roi. Built on the first
+        # frame(roi is known then) and again if roi changes
+        self.regions = regions
+        self.detection_regions = None
+        self._regions_roi = None
 
         # Set type of tqacking
         if tracking == "euclid":  # Euclidean distance
@@ -154,18 +269,34 @@ class ObjectTracking(Mediator):
             self.max_point_distance = int(width * 0.25)  # Todo calculate based on frames and cap size
         else:
             self.max_point_distance = max_point_distance
-        
+        # Predictions are close to where objects are, so detections can be matched from a much smaller distance
+        if prediction_distance is None:
+            self.prediction_distance = self.max_point_distance * 0.25
+        else:
+            self.prediction_distance = prediction_distance
+
         self.mask = None
+        self.blobs = None  # Blobs found in the last mask
         self.display = display
+        if morphology is not None and morphology not in morphology_operations:
+            raise ValueError("Morphology set incorrectly. Should be one of: None, {}".format(
+                ", ".join(morphology_operations)))
+        self.morphology = morphology
+        self._morphology_kernel = np.ones((morphology_kernel, morphology_kernel), np.uint8)
+        # Saving and restoring the background model
+        self.background_file = background_file
+        self.background_save_interval = background_save_interval
+        self._background_saved = time.time()  # Time of last save
+        self._background_restored = False  # Set once restoring was attempted(on first frame, roi size is known then)
 
         # List of all detected objects
         self.objects = []
+        # Changes of objects in the last processed frame
+        self.events = TrackEvents(None, [], [], [])
         # Number of object
         self.object_counter = 0
         self.all_detected_objects = 0  # Serves as a unique id for objects
 
-        self.prev_frame = None  # todo Remove later
-
 
     @property
     def video(self):
@@ -180,6 +311,49 @@ class ObjectTracking(Mediator):
         # Attach self to subject as an observer
         self._video.attach(self)
 
+    @property
+    def channel(self):
+        return self._channel
+
+    @channel.setter
+    def channel(self, channel) -> None:
+        """
+        Setter for channel detection runs on.
+        :param channel: None, str or int
+        :return: None
+        """
+        if channel is None or channel == "gray" or channel in (0, 1, 2):
+            self._channel = channel
+        else:
+            raise ValueError("Channel set incorrectly. Should be one of: None, 'gray', 0, 1, 2")
+
+    @property
+    def assignment(self):
+        return self._assignment
+
+    @assignment.setter
+    def assignment(self, assignment) -> None:
+        """
+        Setter for assignment method used by euclid tracking.
+        :param assignment: str
+        :return: None
+        """
+        if assignment not in assignment_methods:
+            raise ValueError("Assignment set incorrectly. Should be one of: {}".format(", ".join(assignment_methods)))
+        self._assignment = assignment
+
+    def detection_frame(self, roi):
+        """
+        Converts roi to the image detection runs on, based on channel.
+        :param roi: numpy.ndarray -> BGR image of roi
+        :return: numpy.ndarray -> BGR image if channel is None, single channel image otherwise
+        """
+        if self._channel is None or roi.ndim == 2:
+            return roi
+        if self._channel == "gray":
+            return self.cv2.cvtColor(roi, self.cv2.COLOR_BGR2GRAY)
+        return self.cv2.extractChannel(roi, self._channel)
+
     def attach(self, observer: Observer) -> None:
         """
         Attach an observer to the subject
@@ -199,145 +373,220 @@ class ObjectTracking(Mediator):
         for observer in self._observers:
             observer.update()
 
-    def euclid(self, detected_objects) -> None:
+    def gap(self, frames) -> None:
+        """
+        Receive from subject(VideoPlayer) that frames were missed, tracked objects can't be matched across the gap so
+        they get cleared, observers(timers) get notified.
+        :param frames: int -> Number of missed frames
         """
-        Matches new detections with already tracked objects based on smallest euclidean distance,
-        clears old(non moving) objects and creates new tracked objects.
-        :param detected_objects: list -> List containing detected objects which are also lists[x, y, w, h, (cx, cy)]
+        self.events = TrackEvents(self.video.frames, [], [], self.objects)
+        self.objects = []
+        for observer in self._observers:
+            observer.gap(frames)
+
+    def close(self) -> None:
+        """
+        Receive from subject(VideoPlayer) that playing ended, saves background, observers(timers) get notified.
+        """
+        if self.background_file is not None:
+            self.save_background()
+        for observer in self._observers:
+            observer.close()
+
+    def build_regions(self, roi) -> None:
+        """
+        Precomputes regions(bounding boxes and polygon masks) inside roi and creates a detector for each of them.
+        :param roi: tuple(x, y, w, h) -> Roi of video
         :return: None
         """
-        curr_frame = self.video.frames
-        if not detected_objects:  # If there are no detections, delete the ones that haven't been seen in min_frame_diff
-            for obj in self.objects:
-                frame_diff = curr_frame - obj.frames[-1]
-                if frame_diff > self.min_frame_diff:  # If frame diff. too big --> remove object from objects list
-                    self.objects.remove(obj)
-
-        if len(self.objects) == 0:  # If no current objects exist, create objects from detections
-            # This does the same as the above
-            # Update number of objects by 1, as the enumerate starts at 0
-            self.objects += list(
-                map(lambda det: Object(self.all_detected_objects + det[0], curr_frame, det[1][0:2], det[1][2:4], det[1][4]),
-                    enumerate(detected_objects, start=1))
-            )
-            self.all_detected_objects += len(detected_objects)
-            return
-
-        # If objects exist, match them.
-        paired = 0  # Number of objects paired
-        to_be_paired = len(detected_objects)
-        # Go through existing objects first
-        for obj in self.objects:
-            if paired >= to_be_paired:  # If all objects were already paired
-                self.objects.remove(obj)
-                break
-            # Calculate Euclidean distances to match with closest one
-            distances = list(map(lambda det: euclid_dist(obj.center_points[-1], det[4]), detected_objects))
-            # Get index of closest point
-            index_min = min(range(len(distances)), key=distances.__getitem__)
-            # If object is in range of the maximum point distance between two consecutive frames
-            if distances[index_min] <= self.max_point_distance:
-                # Add detection to object as new point
-                closest_detection = detected_objects[index_min]
-                # pos, bound_rect, cntr_point = closest_detection[0:2], closest_detection[2:4], closest_detection[4]
-                obj.add_point(curr_frame, closest_detection[0:2], closest_detection[2:4], closest_detection[4])
-                # Remove detection
-                del detected_objects[index_min]
-                paired += 1
-
-            # Check if object hasn't been seen in the last frames(>min_fr_diff) ==> delete object
-            if curr_frame - obj.frames[-1] > self.min_frame_diff:
-                self.objects.remove(obj)
-                continue
+        polygons = self.video.regions or []
+        if self.regions is not None:
+            polygons = [polygons[i] for i in self.regions]
+        if not polygons:
+            self.detection_regions = [(None, self.bkg_subtractor)]
+        else:
+            if len(polygons) > 1 and self._detector_spec is None:
+                raise ValueError("Every region needs its own detector, pass bkg_subtractor by name to use regions.")
+            # The first region keeps bkg_subtractor, if regions get rebuilt the other detectors start over
+            self.detection_regions = [(Region(polygon, roi),
+                                       self.bkg_subtractor if i == 0 else create_detector(self._detector_spec[0],
+                                                                                          **self._detector_spec[1]))
+                                      for i, polygon in enumerate(polygons)]
+        self._regions_roi = tuple(roi)
+
+    def background_files(self) -> list:
+        """
+        Files backgrounds of detectors get saved to, background_file if there is one detector, otherwise the index of
+        region is added to the file name.
+        :return: list(str, ...)
+        """
+        if len(self.detection_regions) == 1:
+            return [self.background_file]
+        root, extension = os.path.splitext(self.background_file)
+        return ["{}_{}{}".format(root, i, extension) for i in range(len(self.detection_regions))]
 
-            # Check if object hasn't been moving ==> delete the object
-            # Check the last 3 points (3 is enough as objects usually move just slightly)
-            if obj.num_of_points >= 4 and [obj.center_points[-1]] * 3 == obj.center_points[::-1][1:4]:
-                self.objects.remove(obj)
+    def save_background(self) -> bool:
+        """
+        Saves the learned background images of detectors to background_files, files are replaced at once so a crash
+        while saving can't leave a broken file.
+        :return: bool -> False if a detector has no background(yet)
+        """
+        self._background_saved = time.time()
+        if self.detection_regions is None:  # Nothing was played yet
+            return False
+        saved = True
+        for (_, detector), background_file in zip(self.detection_regions, self.background_files()):
+            background = detector.background()
+            if background is None:
+                saved = False
+                continue
+            root, extension = os.path.splitext(background_file)
+            temp_file = root + ".tmp" + (extension or ".png")
+            if not self.cv2.imwrite(temp_file, background):
+                print("Background could not be saved to: {}".format(background_file))
+                saved = False
                 continue
+            os.replace(temp_file, background_file)
+        return saved
+
+    def restore_background(self, index, shape) -> bool:
+        """
+        Restores detector of region from its background file if the saved background matches the size of detection
+        frames.
+        :param index: int -> Index of region in detection_regions
+        :param shape: tuple -> Shape of the image detection runs on
+        :return: bool -> True if background was restored
+        """
+        background_file = self.background_files()[index]
+        if not os.path.exists(background_file):
+            return False
+        background = self.cv2.imread(background_file, self.cv2.IMREAD_UNCHANGED)
+        if background is None or background.shape != shape:
+            print("Saved background does not match roi, starting with a new background model.")
+            return False
+        self.detection_regions[index][1].restore(background)
+        print("Background restored from: {}".format(background_file))
+        return True
 
-            # Remaining detections get created as new objects
-            for detection in detected_objects:
-                self.all_detected_objects += 1
-                new_obj = Object(self.all_detected_objects,
-                                 curr_frame,
-                                 detection[0:2],
-                                 detection[2:4],
-                                 detection[4])
-                self.objects.append(new_obj)
+    def euclid(self, detected_objects) -> None:
+        """
+        Matches new detections with already tracked objects based on euclidean distance. Distances between all objects
+        and detections are calculated at once and assigned globally(see assignment), then old(non moving) objects get
+        cleared and new tracked objects get created from unmatched detections. Changes are saved to events.
+        :param detected_objects: numpy.ndarray -> Detected objects of shape (n, 6), rows are (x, y, w, h, cx, cy)
+        :return: None
+        """
+        curr_frame = self.video.frames
+        timestamp = self.video.timestamp
+        # If frames are skipped(stride), objects move further and are seen less often between processed frames
+        frame_step = self.video.frame_step
+        min_frame_diff = max(self.min_frame_diff, frame_step)
+        max_point_distance = self.max_point_distance * frame_step
+
+        matched_detections = np.zeros(len(detected_objects), dtype=bool)
+        updated = []
+        if self.objects and len(detected_objects):
+            if self.motion_model is None:
+                points = [obj.last_center_point for obj in self.objects]
+                max_distances = max_point_distance
+            else:
+                # Objects with known velocity are matched near their predicted position, new ones like without a model
+                points = self.motion_model.predict(self.objects, curr_frame)
+                max_distances = np.array([self.prediction_distance * (curr_frame - obj.last_frame) ** 0.5
+                                          if self.motion_model.has_velocity(obj) else max_point_distance
+                                          for obj in self.objects])
+            rows, cols = assign(points, detected_objects[:, 4:6],
+                                max_distances, self._assignment, self.spatial_index)
+            for row, col in zip(rows, cols):
+                obj, detection = self.objects[row], detected_objects[col]
+                obj.add_point(curr_frame, detection[0:2], detection[2:4], detection[4:6], timestamp)
+                if self.motion_model is not None:
+                    self.motion_model.update(obj)
+                updated.append(obj)
+            matched_detections[cols] = True
+
+        # Remove objects that haven't been seen in the last frames(>min_frame_diff) or haven't been moving, the last 3
+        # points are checked(3 is enough as objects usually move just slightly)
+        objects, lost = [], []
+        for obj in self.objects:
+            if curr_frame - obj.last_frame <= min_frame_diff and obj.still_points < 3:
+                objects.append(obj)
+            else:
+                lost.append(obj)
+        self.objects = objects
+        if lost:
+            # Objects lost in this frame aren't reported as updated
+            lost_ids = {obj.id for obj in lost}
+            updated = [obj for obj in updated if obj.id not in lost_ids]
+
+        # Remaining detections get created as new objects
+        created = []
+        for detection in detected_objects[~matched_detections]:
+            self.all_detected_objects += 1
+            obj = Object(self.all_detected_objects, curr_frame, detection[0:2], detection[2:4], detection[4:6], timestamp,
+                         self.max_history)
+            if self.motion_model is not None:
+                self.motion_model.init(obj)
+            self.objects.append(obj)
+            created.append(obj)
+        self.events = TrackEvents(curr_frame, created, updated, lost)
 
     def update(self) -> None:
         """
         Receive update from subject(VideoPlayer) at each frame when video is playing, apply roi bkg_subtractor,
         find detections, ...
         """
-        # video.roi has to be set by now
+        headless = self.video.headless  # Nothing gets drawn or displayed in headless mode
+        # video.roi has to be set by now, roi_frame is the part of frame inside roi
         xr, yr, wr, hr = self.video.roi
-        roi = self.video.frame[yr: yr + hr, xr: xr + wr]
-        # Apply roi to background subtractor
-        self.mask = self.bkg_subtractor.apply(roi)
-        _, self.mask = self.cv2.threshold(self.mask, 254, 255, self.cv2.THRESH_BINARY)  # BINARY
-
-        # Find contours
-        contours, _ = self.cv2.findContours(self.mask, self.cv2.RETR_EXTERNAL, self.cv2.CHAIN_APPROX_SIMPLE)
-        # Other possibility
-        # contours, hierarchy = self.cv2.findContours(self.mask, 1, 2)
-
-        detected_objects = []  # A list of contours that fit the parameter of size: [[x, y, w, h, center_point], ...]
-        for contour in contours:
-            area = self.cv2.contourArea(contour)
-            if self.maximum_object_size > area > self.minimum_object_size:
-                # Get bounding rectangle
-                x, y, w, h = self.cv2.boundingRect(contour)
-                # Get center point, add roi values as this is only on mask which is set by roi
-                self.cv2.rectangle(roi, (x, y), (x + w, y + h), (0, 255, 0), 3)
-                self.cv2.circle(roi, (x + w // 2, y + h // 2), 3, (0, 0, 255), 3)
-                center_point = (x + xr + w // 2, y + yr + h // 2)  # add roi values for upper left corner of roi
-                detected_objects.append([x, y, w, h, center_point])  # Save object to list
-
-        self.tracking(detected_objects)  # Pass to the set tracking function
-        # Notify observers (Timer)
-        self.notify()
-        if self.display:
-            self.cv2.imshow("Mask", self.mask)
-
-    def update1(self):  # Testing alternative
-        # video.roi has to be set by now
-        xr, yr, wr, hr = self.video.roi
-        roi = self.video.frame[yr: yr + hr, xr: xr + wr]
-
-        if self.prev_frame is None:
-            self.prev_frame = self.cv2.cvtColor(roi, self.cv2.COLOR_BGR2GRAY)
-            return
-        else:
-            curr_frame = self.cv2.cvtColor(roi, self.cv2.COLOR_BGR2GRAY)
-            self.mask = self.cv2.absdiff(self.prev_frame, curr_frame)
-            self.prev_frame = self.cv2.cvtColor(roi, self.cv2.COLOR_BGR2GRAY)
-
-            ret, self.mask = self.cv2.threshold(self.mask, 150, 255, self.cv2.THRESH_BINARY)
-            kernel = np.ones((3, 3), np.uint8)
-            self.mask = self.cv2.dilate(self.mask, kernel, iterations=3)
-
-        # Find contours
-        contours, _ = self.cv2.findContours(self.mask, self.cv2.RETR_EXTERNAL, self.cv2.CHAIN_APPROX_SIMPLE)
-        # Other possibility
-        # contours, hierarchy = self.cv2.findContours(self.mask, 1, 2)
-
-        detected_objects = []  # A list of contours that fit the parameter of size: [[x, y, w, h, center_point], ...]
-        for contour in contours:
-            print(contour)
-            area = self.cv2.contourArea(contour)
-            if area > self.minimum_object_size:
-                # Get bounding rectangle
-                x, y, w, h = self.cv2.boundingRect(contour)
-                # Get center point, add roi values as this is only on mask which is set by roi
+        roi = self.video.roi_frame
+        if self.detection_regions is None or self._regions_roi != tuple(self.video.roi):
+            self.build_regions(self.video.roi)
+        if self.background_file is not None and self._background_restored and \
+                self.background_save_interval is not None and \
+                time.time() - self._background_saved >= self.background_save_interval:
+            self.save_background()
+        show_mask = self.display and not headless
+        if show_mask and self.detection_regions[0][0] is not None:
+            self.mask = np.zeros((hr, wr), dtype=np.uint8)  # Masks of regions get drawn on it
+        blobs_list, offsets = [], []
+        for i, (region, detector) in enumerate(self.detection_regions):
+            image = roi if region is None else region.crop(roi)
+            # Apply roi(or bounding box of region) to detector, on a single channel if set, mask is binary
+            detection_frame = self.detection_frame(image)
+            if self.background_file is not None and not self._background_restored:
+                self.restore_background(i, detection_frame.shape)
+            mask = detector.apply(detection_frame)
+            if region is not None:
+                mask = region.apply_mask(mask)
+            if self.morphology is not None:
+                mask = clean_mask(mask, self.morphology, self._morphology_kernel)
+            # Find blobs that fit the parameters of size
+            blobs_list.append(extract_blobs(mask, self.minimum_object_size, self.maximum_object_size))
+            if region is None:
+                self.mask = mask
+                offsets.append((0, 0))
+            else:
+                x, y, w, h = region.box
+                offsets.append((x, y))
+                if show_mask:
+                    self.mask[y: y + h, x: x + w] |= mask
+        self._background_restored = True
+        self.blobs = blobs_list[0] if offsets == [(0, 0)] else merge_blobs(blobs_list, offsets)
+        # Add roi values for upper left corner of roi to center points
+        detected_objects = blob_detections(self.blobs, (xr, yr))  # [[x, y, w, h, cx, cy], ...]
+        if not headless:
+            for x, y, w, h in self.blobs.boxes.tolist():
                 self.cv2.rectangle(roi, (x, y), (x + w, y + h), (0, 255, 0), 3)
                 self.cv2.circle(roi, (x + w // 2, y + h // 2), 3, (0, 0, 255), 3)
-                center_point = (x + xr + w // 2, y + yr + h // 2)  # add roi values for upper left corner of roi
-                detected_objects.append([x, y, w, h, center_point])  # Save object to list
+            if self.video.frame is not None:
+                for region, _ in self.detection_regions:
+                    if region is not None:
+                        self.cv2.polylines(self.video.frame, [np.asarray(region.polygon, dtype=np.int32)], True,
+                                           (0, 255, 255), 2)
 
         self.tracking(detected_objects)  # Pass to the set tracking function
         # Notify observers (Timer)
         self.notify()
-        if self.display:
+        if show_mask:
             self.cv2.imshow("Mask", self.mask)
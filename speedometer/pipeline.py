@@ -0,0 +1,193 @@
+"""
+Multi-process pipeline: frames get decoded and preprocessed(rotated, resized/cropped) in a decoder process and passed
+to detection/tracking(observers of VideoPlayer) in the main process through a ring of NumPy frame buffers in shared
+memory, only slot numbers go through the queues so frames never get pickled.
+"""
+from speedometer.video import VideoPlayer
+
+from multiprocessing import shared_memory
+import multiprocessing
+import queue
+import time
+import numpy as np
+
+
+class SharedFrameRing:
+    """
+    Ring of equally sized frame buffers in shared memory, frames is a NumPy array of shape (slots, *shape) backed by
+    the shared memory, so both processes read and write the same frames without copying them.
+    """
+    def __init__(self, shape, slots, dtype=np.uint8, name=None):
+        """
+        :param shape: tuple -> Shape of one frame (height, width, channels)
+        :param slots: int -> Number of frame buffers
+        :param dtype: numpy.dtype -> Type of frame pixels. Preset: numpy.uint8
+        :param name: str -> Name of existing shared memory to attach to, creates new shared memory if None
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        size = int(np.prod(self.shape)) * self.dtype.itemsize * slots
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        """
+        Closes shared memory, the creator of the ring also frees it.
+        """
+        del self.frames  # Array has to be released before the buffer can be closed
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def decode_frames(config, ring_name, shape, slots, free_slots, ready, stop_event, start_seconds=None,
+                  end_seconds=None) -> None:
+    """
+    Decoder process: reads and preprocesses frames of videos into free slots of the ring, puts
+    (slot, frame_number, timestamp, gap) to ready queue for every frame and None when done.
+    :param config: dict -> Parameters of VideoPlayer
+    :param ring_name: str -> Name of SharedFrameRing shared memory
+    :param shape: tuple -> Shape of one frame in ring
+    :param slots: int -> Number of slots in ring
+    :param free_slots: multiprocessing.Queue -> Slots the detection process is done with
+    :param ready: multiprocessing.Queue -> Preprocessed frames
+    :param stop_event: multiprocessing.Event -> Set when decoding should stop
+    :param start_seconds: int or float -> Passed to VideoPlayer.open_video
+    :param end_seconds: int or float -> Second of video to stop decoding at
+    :return: None
+    """
+    ring = SharedFrameRing(shape, slots, name=ring_name)
+    rotate, interpolation = config.pop("rotate"), config.pop("interpolation")
+    video = VideoPlayer(headless=True, **config)
+    video._rotate, video._interpolation = rotate, interpolation  # Already converted to cv2 values
+    video.reset_stop(end_seconds=end_seconds)
+    try:
+        for video_path in video.video_list:
+            if stop_event.is_set() or video.stopped:
+                break
+            cap = video.open_video(video_path, start_seconds)
+            if cap is None:
+                continue
+            live = video.is_live(video_path)
+            while not stop_event.is_set() and not video.stopped:
+                video.frames += 1
+                if video.frame_due(video.frames):
+                    ret, frame = cap.read()
+                else:  # Skipped by stride
+                    ret, frame = cap.grab(), None
+                if not ret:
+                    video.frames -= 1
+                    break
+                gap = cap.pop_gap()
+                video.frames += gap
+                if frame is None:
+                    continue
+                # Live streams drop frames when detection is behind, files wait for a free slot
+                slot = None
+                while slot is None and not stop_event.is_set():
+                    try:
+                        slot = free_slots.get(timeout=0.1) if not live else free_slots.get_nowait()
+                    except queue.Empty:
+                        if live:
+                            break
+                if slot is None:
+                    continue
+                video.preprocess(frame, out=ring.frames[slot])
+                video._last_processed_frame = video.frames
+                ready.put((slot, video.frames, cap.timestamp, gap))
+            cap.release()
+    finally:
+        ready.put(None)
+        ring.close()
+
+
+class SharedMemoryPipeline:
+    """
+    Plays a VideoPlayer with decoding and preprocessing in a separate process, the main process only runs the
+    observers(ObjectTracking, Radar). Frames are passed through a SharedFrameRing, so there are no per-frame copies
+    between processes, decoding and detection run on different cores.
+    """
+    def __init__(self, video, slots=4):
+        """
+        :param video: VideoPlayer -> Video with observers attached, its settings are used by the decoder process
+        :param slots: int -> Number of frame buffers in shared memory. Preset: 4
+        """
+        self.video = video
+        self.slots = slots
+        self.decoder = None  # Decoder process, set when running
+
+    def frame_shape(self) -> tuple:
+        """
+        Shape of preprocessed frames, roi if crop_first is set else the resized frame.
+        :return: tuple(height, width, channels)
+        """
+        if self.video.crop_first:
+            _, _, wr, hr = self.video.roi
+            return hr, wr, 3
+        return self.video.height, self.video.width, 3
+
+    def run(self, start_seconds=None, timeout=None, end_seconds=None) -> None:
+        """
+        Plays video, same parameters as VideoPlayer.play.
+        :param start_seconds: int or float -> Second of video to start playing at.
+        :param timeout: float -> Number of seconds after which playing stops.
+        :param end_seconds: int or float -> Second of video to stop playing at.
+        :return: None
+        """
+        video = self.video
+        if video.roi is None:
+            video.roi = (0, 0, video.width, video.height)
+        shape = self.frame_shape()
+        ring = SharedFrameRing(shape, self.slots)
+        context = multiprocessing.get_context("spawn")
+        free_slots, ready, stop_event = context.Queue(), context.Queue(), context.Event()
+        for slot in range(self.slots):
+            free_slots.put(slot)
+        config = {"video_path": video.video_list, "fps": video.fps, "roi": video.roi, "resize": video.resize,
+                  "rotate": video.rotate, "interpolation": video.interpolation, "crop_first": video.crop_first,
+                  "frame_stride": video.frame_stride, "reconnect_delay": video.reconnect_delay,
+                  "max_reconnect_delay": video.max_reconnect_delay, "max_reconnects": video.max_reconnects,
+                  "data_file": video.data_file, "start_timestamp": video.start_timestamp}
+        self.decoder = context.Process(target=decode_frames, daemon=True,
+                                       args=(config, ring.name, shape, self.slots, free_slots, ready, stop_event,
+                                             start_seconds, end_seconds))
+        video.reset_stop(timeout)
+        self.decoder.start()
+        xr, yr, wr, hr = video.roi
+        try:
+            while not video.stopped:
+                try:
+                    item = ready.get(timeout=0.5)
+                except queue.Empty:
+                    if self.decoder.is_alive():
+                        continue
+                    break
+                if item is None:  # Decoder is done
+                    break
+                slot, video.frames, video.timestamp, missed = item
+                start_time = time.time()
+                if missed:
+                    video.gap(missed)
+                frame = ring.frames[slot]
+                if video.crop_first:
+                    video.frame, video.roi_frame = None, frame
+                else:
+                    video.frame, video.roi_frame = frame, frame[yr: yr + hr, xr: xr + wr]
+                stop = video.observe(start_time)
+                video.frame = video.roi_frame = None  # Slot gets reused by decoder
+                free_slots.put(slot)
+                if stop:
+                    break
+        finally:
+            stop_event.set()
+            self.decoder.join(timeout=5)
+            if self.decoder.is_alive():
+                self.decoder.terminate()
+            ring.close()
+            video.close()
@@ -1,10 +1,12 @@
 from speedometer.Observer import Observer
 from speedometer.helper_functions import open_data_file, save_to_data_file, euclid_dist
+from speedometer.writer import MeasurementWriter
+from speedometer.sinks import sinks, create_sink
 
 import cv2
-import os
+import numpy as np
+import threading
 from datetime import datetime
-import csv
 
 
 class VerticalLine:
@@ -58,6 +60,14 @@ class VerticalLine:
         """
         return point[0] >= self.x(point[1])
 
+    def x_table(self, rows) -> np.ndarray:
+        """
+        X values of line at all rows at once.
+        :param rows: numpy.ndarray -> y values
+        :return: numpy.ndarray -> x values of ints
+        """
+        return np.full(len(rows), self.point1[0], dtype=np.int64)
+
     def __repr__(self):
         """
         Representation of object used for printing.
@@ -134,6 +144,16 @@ class Line:
         """
         return point[0] >= self.x(point[1])
 
+    def x_table(self, rows) -> np.ndarray:
+        """
+        X values of line at all rows at once, same as x(y) for each row.
+        :param rows: numpy.ndarray -> y values
+        :return: numpy.ndarray -> x values of ints
+        """
+        if self.vertical:
+            return np.full(len(rows), self.point1[0], dtype=np.int64)
+        return np.trunc((rows - self.n) / self.k).astype(np.int64)
+
     def __repr__(self):
         """
         Representation of object used for printing.
@@ -160,18 +180,32 @@ class Radar(Observer):
     def __init__(self, video, **kwargs):
         """
         :param video: VideoPlayer object, is needed as the class wraps all of its observers(ObjectDetectors).
-        :param save: bool -> If all set settings should be saved to saved_data.json. Preset: False
-        :param load: bool -> If data should be loaded from saved_data.json
+        :param save: bool -> If all set settings should be saved to data_file of video. Preset: False
+        :param load: bool -> If data should be loaded from data_file of video(saved_data.json)
         :param lines: list[list[list[], list[]], list[list[], list[]]] -> list of two lines, each line is represented
         by a list consisting of two points where each point is a list pair [x, y] -> could all be tuples.
+        :param perspective: tuple(image_points, ground_points) -> Calibration of the ground plane, see set_perspective.
+        If set, distances travelled are measured on the ground in any direction instead of horizontally with dpp.
+        Loaded from data_file with load. Preset: None
         :param out_file: str -> Filename of csv file, if the param. is set to some string -> data gets saved to file.
+        Extension of sink is added if missing. Rows are written by a MeasurementWriter on its own thread, queued rows
+        get written when playing ends.
+        :param sink: str -> Type of file data gets saved to, name of a registered sink(see sinks.sinks) possible:
+        "csv"(preset), "sqlite"(database indexed by end_time, speed and direction), "columnar"(directory with a typed
+        binary file per column). Load saved data with sinks.load_measurements.
+        :param writer_params: dict -> Parameters of MeasurementWriter(batch_size, flush_interval, max_queue, overflow,
+        fsync). Preset: None(defaults of MeasurementWriter)
         :param print_measured:  bool -> If measured objects should be printed out to the console/shell.
+        :param measurement_window: tuple(int, int) -> Frames (start_frame, end_frame), only objects whose end frame
+        is in [start_frame, end_frame) get measured. Frames before start_frame only warm up the trackers. Preset: None
         """
         self.video = video
         self.cv2 = video.cv2  # Points at the same cv2 as video
-        self.curr_measured = []  # List of curr. measured objects
-        self.curr_measured_dict = dict()  # Currently measured objects{obj:{"start_frame": sindex, "end_frame": eindex}}
+        self.curr_measured_dict = dict()  # Currently measured objects{obj:{"start": point, "end": point}}
         self.obj_trackers = []  # Set list for object trackers
+        # Trackers can notify from different threads(video.observer_threads), one pass is done per frame
+        self._lock = threading.Lock()
+        self._processed_frame = None
         # Get video FPS, and calculate constants
         self.FPS = self.video.fps  # Should always be set (fr/s)
         self.TPF = 1 / self.FPS  # Time Per Frame in seconds (s/fr)
@@ -189,7 +223,13 @@ class Radar(Observer):
         self.left_line = None
         self.right_line = None
         self.distance = None
-        self.dpp = None  # Distance Per Pixel (m/px) based on y point of frame (as per space perception)
+        self.dpp = None  # Distance Per Pixel (m/px) of each row(y) of frame (as per space perception), numpy array
+        self.left_x = None  # X of left line in each row of frame, numpy array
+        self.right_x = None  # X of right line in each row of frame, numpy array
+        # This get set when perspective is set in the property.setter
+        self._perspective = None
+        self.homography = None  # Perspective transform(3x3) from frame to ground(m)
+        self.ground_map = None  # Ground position(x, y in m) of each pixel of frame, numpy array (height, width, 2)
         # Check kwargs
         keys = kwargs.keys()
         # If save is set to True
@@ -201,12 +241,14 @@ class Radar(Observer):
         if "load" in keys:
             if kwargs["load"]:
                 # Load data from saved_data
-                data = open_data_file()
+                data = open_data_file(self.video.data_file)
                 data_keys = data.keys()
                 if "lines" in data_keys:
                     self.lines = data["lines"]
                 else:
                     self.lines = None
+                if "perspective" in data_keys:
+                    self.perspective = data["perspective"]
                 pass
         # If load is not set, get variables from paramaters
         else:
@@ -214,19 +256,30 @@ class Radar(Observer):
                 self.lines = kwargs["lines"]
             else:
                 self.lines = None
+            if kwargs.get("perspective") is not None:
+                self.perspective = kwargs["perspective"]
 
         # Save file gets set in setter along with save_measured_data
         self._save_data_filename = None
         self.save_measured_data = False
-        if "out_file" in keys:  # For saving actual data in a csv file
+        self.writer = None  # MeasurementWriter, created with the first saved row and closed when playing ends
+        self.writer_params = dict(kwargs["writer_params"]) if kwargs.get("writer_params") else {}
+        self.sink = kwargs.get("sink", "csv")
+        if self.sink not in sinks:
+            raise ValueError("Sink set incorrectly. Should be one of: {}".format(", ".join(sinks)))
+        if "out_file" in keys:  # For saving actual data in a file
             filename = kwargs["out_file"]
-            # Check if filename has csv extension
-            if not filename.endswith(".csv"):
-                filename += ".csv"
-                self.save_data_filename = filename
+            # Check if filename has the extension of sink
+            extension = getattr(sinks[self.sink], "extension", None)
+            if extension and not filename.endswith(extension):
+                filename += extension
             self.save_data_filename = filename
             self.save_measured_data = True
 
+        self.measurement_window = None
+        if "measurement_window" in keys:
+            self.measurement_window = kwargs["measurement_window"]
+
         self.print_measured = False  # Used to print object data when object is measured
         # If print measured is set to true
         if "print_measured" in keys:
@@ -273,65 +326,145 @@ class Radar(Observer):
             self.distance = distance
             self._lines = (self.left_line, self.right_line, self.distance)
             print(self.left_line, self.right_line)
-            # Set the distance between lines at given y-val.(height of screen)
+            # Lines and the distance between them get compiled to tables with a value for each row(y) of frame
+            rows = np.arange(max(self.video.height, self.left_line.point2[1], self.right_line.point2[1]) + 1)
+            self.left_x = self.left_line.x_table(rows)
+            self.right_x = self.right_line.x_table(rows)
             if vertical:  # If lines are vertical, dpp is a constant, pixel difference can be cal. between top points
                 dist_between_lines_px = self.right_line.point1[0] - self.left_line.point1[0]  # Distance in px
-                self.dpp = lambda y: self.distance / dist_between_lines_px
+                self.dpp = np.full(len(rows), self.distance / dist_between_lines_px)
             else:  # If not vertical, distance changes per height and is not constant
-                self.dpp = lambda y: distance / (self.right_line.x(y) - self.left_line.x(y))  # Distance per pixel
+                with np.errstate(divide="ignore"):  # Rows where lines cross have no distance
+                    self.dpp = distance / (self.right_x - self.left_x)  # Distance per pixel
 
             # Save data settings to saved_data.json
             if self.save:
                 data = {"lines": (tuple(self.left_line), tuple(self.right_line), self.distance)}
-                save_to_data_file(data)
+                save_to_data_file(data, self.video.data_file)
 
         except IndexError:
             error = "Missing value, the lines variable is a tuple consisting of 3 values: (line1, line2, distance). " \
                     "Check that you are not missing one."
             raise IndexError(error)
 
+    @property
+    def perspective(self):
+        return self._perspective
+
+    @perspective.setter
+    def perspective(self, perspective):
+        """
+        Computes the perspective transform of the ground plane and precomputes the ground position of every pixel.
+        :param perspective: tuple(image_points, ground_points) -> See set_perspective
+        :return: None
+        """
+        image_points, ground_points = perspective
+        image_points = np.asarray(image_points, dtype=np.float32).reshape(-1, 2)
+        ground_points = np.asarray(ground_points, dtype=np.float32)
+        if ground_points.shape == (2,):  # (width, length) of a rectangle, corners in the order of image points
+            width, length = ground_points
+            ground_points = np.array([[0, 0], [width, 0], [width, length], [0, length]], dtype=np.float32)
+        ground_points = ground_points.reshape(-1, 2)
+        if len(image_points) != 4 or len(ground_points) != 4:
+            raise ValueError("Perspective needs 4 image points and 4 ground points(or ground rectangle size).")
+        self.homography = self.cv2.getPerspectiveTransform(image_points, ground_points)
+        # Ground position of each pixel, a measurement then only looks up its two points
+        height, width = self.video.height, self.video.width
+        pixels = np.indices((height, width), dtype=np.float32)[::-1].transpose(1, 2, 0)  # (x, y) of each pixel
+        self.ground_map = self.cv2.perspectiveTransform(pixels.reshape(1, -1, 2), self.homography).reshape(
+            height, width, 2)
+        self._perspective = (image_points.tolist(), ground_points.tolist())
+
+    def ground_distance(self, point1, point2) -> float:
+        """
+        Distance on the ground between two points of frame, calculated with ground_map.
+        :param point1: tuple(x, y)
+        :param point2: tuple(x, y)
+        :return: float -> Distance in meters
+        """
+        height, width = self.ground_map.shape[:2]
+        x1, y1 = min(max(int(point1[0]), 0), width - 1), min(max(int(point1[1]), 0), height - 1)
+        x2, y2 = min(max(int(point2[0]), 0), width - 1), min(max(int(point2[1]), 0), height - 1)
+        return float(np.linalg.norm(self.ground_map[y2, x2] - self.ground_map[y1, x1]))
+
+    def set_perspective(self, image_points, ground_points, save=False) -> None:
+        """
+        Sets the perspective calibration without a window(offline, headless), from four points in frame whose positions
+        on the ground are known, e.g. corners of a lane marking or of a rectangle measured on the road. No three of the
+        points should be on the same line.
+        :param image_points: list -> Four points [(x1, y1), ...] in coordinates of the resized frame
+        :param ground_points: list or tuple -> Positions [(x1, y1), ...] of the image points on the ground in meters,
+        or (width, length) of a rectangle if image points are its corners in order: top left, top right, bottom right,
+        bottom left(as seen on frame)
+        :param save: bool -> If the calibration should be saved to data_file of video
+        :return: None
+        """
+        self.perspective = (image_points, ground_points)
+        if save:
+            save_to_data_file({"perspective": self.perspective}, self.video.data_file)
+
+    def select_perspective(self, ground_points, save=False) -> None:
+        """
+        Method opens a frame of the video, user selects the four image points of set_perspective by clicking on them.
+        :param ground_points: list or tuple -> See set_perspective
+        :param save: bool -> If the calibration should be saved to data_file of video
+        :return: None
+        """
+        instr = "\nSelect perspective button controls:\nLEFT MOUSE BUTTON to select a point, select 4 points in the " \
+                "order of ground points(top left, top right, bottom right, bottom left for a rectangle)\n" \
+                "RIGHT MOUSE BUTTON to reset/delete all selected points\ns BUTTON(lowercase) to save and exit\n" \
+                "esc BUTTON to exit without saving to object\n"
+        print(instr)
+        points = []
+        # Get one frame of video, resized so points match the processed frames
+        cap = self.cv2.VideoCapture(self.video.video_list[0])
+        _, frame = cap.read()
+        cap.release()
+        frame = self.cv2.resize(frame, self.video.resize, fx=0, fy=0, interpolation=cv2.INTER_CUBIC)
+        frame_copy = [frame.copy()]
+
+        def on_mouse(event, x, y, flags, params):
+            if event == self.cv2.EVENT_LBUTTONDOWN and len(points) < 4:
+                points.append((x, y))
+                self.cv2.circle(frame_copy[0], (x, y), 3, (0, 0, 255), 2)
+                if len(points) > 1:
+                    self.cv2.line(frame_copy[0], points[-2], points[-1], (0, 255, 0), 2)
+                if len(points) == 4:
+                    self.cv2.line(frame_copy[0], points[-1], points[0], (0, 255, 0), 2)
+            elif event == self.cv2.EVENT_RBUTTONDOWN:
+                points.clear()
+                frame_copy[0] = frame.copy()
+            self.cv2.imshow('Select perspective', frame_copy[0])
+
+        self.cv2.imshow('Select perspective', frame)
+        self.cv2.setMouseCallback('Select perspective', on_mouse)
+        key = self.cv2.waitKey(0)
+        self.cv2.destroyAllWindows()
+        if key == 115 and len(points) == 4:  # 115 = s in ASCII table
+            self.set_perspective(points, ground_points, save)
+        else:
+            print("Exiting")
+
     @property
     def save_data_filename(self):
         return self._save_data_filename
 
     @save_data_filename.setter
     def save_data_filename(self, filename) -> None:
-        # Check if filename alredy exists
-        if os.path.exists(filename):
-            self._save_data_filename = filename
-            self.save_measured_data = True
-        # Create file
-        else:
-            self._save_data_filename = filename
-            self.save_measured_data = True
-            with open(self._save_data_filename, mode='w', newline="") as file:
-                data_file = csv.writer(file, delimiter=',')
-                data_file.writerow(["id",
-                                    "start_time",
-                                    "end_time",
-                                    "time_diff",
-                                    "x_dir",
-                                    "y_dir",
-                                    "start_frame",
-                                    "end_frame",
-                                    "frame_diff",
-                                    "calculated_time",
-                                    "calculated_distance",
-                                    "speed_mps",
-                                    "speed_kmh",
-                                    "avg_size"])
+        # File gets created(or appended to) by sink once the first object is measured, csv files get a header
+        self._save_data_filename = filename
+        self.save_measured_data = True
 
     def save_to_file(self, data) -> None:
         """
-        Saves given data to csv file.
+        Queues given data to be saved to file by writer, file is written on the thread of writer.
         :param data: dict[data_name: value, ...]
         :return: None
         """
+        if self.writer is None:
+            self.writer = MeasurementWriter(create_sink(self.sink, self._save_data_filename), **self.writer_params)
         # Dicts. are ordered from Python 3.7 up
-        data_list = data.values()
-        with open(self._save_data_filename, mode='a', newline="") as file:
-            data_file = csv.writer(file, delimiter=',')
-            data_file.writerow(data_list)
+        self.writer.write(list(data.values()))
 
     def calculate_data_of_timed_object(self, obj) -> None:
         """
@@ -340,28 +473,33 @@ class Radar(Observer):
         :param obj: Object
         :return: None
         """
-        # Get index of start and end from which the object was timed/measured
-        start_index = obj.frames.index(self.curr_measured_dict[obj]["start_frame"])
-        end_index = obj.frames.index(self.curr_measured_dict[obj]["end_frame"])
-        # Get start end time calculate difference
-        start_time, end_time = obj.times[start_index], obj.times[end_index]
+        # Points(frame, time, center point) at which the object started and ended being timed/measured
+        start_frame, start_time, start_center_point = self.curr_measured_dict[obj]["start"]
+        end_frame, end_time, end_center_point = self.curr_measured_dict[obj]["end"]
+        # Calculate time difference
         time_diff = end_time - start_time
         # Get direction
         x_dir, y_dir = obj.direction()
-        # Get start end frame, calculate diff.
-        start_frame, end_frame = obj.frames[start_index], obj.frames[end_index]
+        # Objects that exit outside of the measurement window are not measured
+        if self.measurement_window is not None:
+            window_start, window_end = self.measurement_window
+            if not window_start <= end_frame < window_end:
+                return
         frame_diff = end_frame - start_frame
         # Calculate time based on frame diff
         calculated_time = self.TPF * frame_diff
         if calculated_time <= 0.4:  # Prone to zero division errors otherwise, todo make dynamic
             return
         # Calculate speed in km/h and m/s
-        # Get distance traveled in x-direction, calculate based on dpp
-        start_center_point, end_center_point = obj.center_points[start_index], obj.center_points[end_index]
-        distance_in_px = abs(start_center_point[0] - end_center_point[0]) # euclid_dist(start_center_point, end_center_point)
-        avg_height = int((start_center_point[1] + end_center_point[1]) / 2)  # y - cordinate
-        distance_in_m = distance_in_px * self.dpp(avg_height)  # Doing this with avg. height isn't optimal, as the dist.
-        # changes with height, assuming obj. are moving horizontally this works fine
+        if self.ground_map is not None:
+            # Distance on the ground between the positions of both points, valid for any direction
+            distance_in_m = self.ground_distance(start_center_point, end_center_point)
+        else:
+            # Get distance traveled in x-direction, calculate based on dpp
+            distance_in_px = abs(start_center_point[0] - end_center_point[0]) # euclid_dist(start_center_point, end_center_point)
+            avg_height = int((start_center_point[1] + end_center_point[1]) / 2)  # y - cordinate
+            distance_in_m = distance_in_px * self.dpp[self.row(avg_height)]  # Doing this with avg. height isn't optimal, as the dist.
+            # changes with height, assuming obj. are moving horizontally this works fine
         # Calculate speed
         speed_mps = round(distance_in_m / calculated_time, 2)
         speed_kmh = round(speed_mps * 3.6, 2)
@@ -391,44 +529,98 @@ class Radar(Observer):
             self.save_to_file(data)
 
     def update(self) -> None:
-        """  TODO currently implemented for only one object tracker, should be for more
-        Receive update from subject(ObjectDetection) while video is playing, check objects position.
-        Checks which objects are in timing area, once the objects exits -> calculates its data.
+        """
+        Receive update from subjects(ObjectDetections) while video is playing, check objects position.
+        Every tracker notifies radar once it processed a frame(can be from different threads), radar does one pass over
+        all trackers once all of them processed the current frame. Only objects that changed in this frame
+        (tracker.events) get checked, objects that weren't created or updated didn't move. Checks which objects are in
+        timing area, once the objects exits -> calculates its data.
+        :return: None
+        """
+        with self._lock:
+            frame = self.video.frames
+            # Already done or some trackers didn't process this frame yet
+            if self._processed_frame == frame or any(tracker.events.frame != frame for tracker in self.obj_trackers):
+                return
+            self._processed_frame = frame
+            for tracker in self.obj_trackers:
+                self.update_objects(tracker.events)
+        # Draw lines on frames, skipped in headless mode or if whole frame isn't set(roi cropped first)
+        if self.video.headless or self.video.frame is None:
+            return
+        self.cv2.line(self.video.frame, self.left_line.point1, self.left_line.point2, (255, 0, 0), 2)
+        self.cv2.line(self.video.frame, self.right_line.point1, self.right_line.point2, (255, 0, 0), 2)
+
+    def update_objects(self, events) -> None:
+        """
+        Starts timing objects that entered the timing area, calculates data of timed objects that exited it.
+        :param events: TrackEvents -> Changes of objects of one tracker in the current frame
         :return: None
         """
-        # Get first tracker object
-        tracker = self.obj_trackers[0]  # todo fix --> iterate through all detectors
-        # Go trough each currently detected object
-        for obj in tracker.objects:
-            curr_pos = obj.center_points[-1]
+        # Go trough each object that got a new position, positions of all of them get checked at once
+        objects = events.created + events.updated
+        if objects:
+            inside, outside = self.zones([obj.last_center_point for obj in objects])
+        else:
+            inside, outside = [], []
+        for obj, in_area, out_of_area in zip(objects, inside, outside):
             # Check if object is being timed
-            if obj in self.curr_measured:
-                # Check if object is out of the measuring area (outside of lines)
-                # If measured and out of measuring area --> passed second line
-                if self.left_line <= curr_pos >= self.right_line or self.left_line > curr_pos < self.right_line:
-                    self.curr_measured.remove(obj)
-                    # Set end frame index of object
-                    self.curr_measured_dict[obj]["end_frame"] = obj.frames[-1]
+            if obj in self.curr_measured_dict:
+                # If measured and out of measuring area (outside of lines) --> passed second line
+                if out_of_area:
+                    # Set end point of object, objects only keep their last points so it gets saved
+                    self.curr_measured_dict[obj]["end"] = obj.point()
                     # Pass to calculate data
                     self.calculate_data_of_timed_object(obj)
                     # Remove from currently measured
                     del self.curr_measured_dict[obj]
-            # If not tracked, check if in between lines
-            else:
-                # If between lines save to curr_measured
-                if self.left_line >= curr_pos >= self.right_line:  # Other way around cause of __lt__, __gt__
-                    # Create object in dictionary, save start frame --> frames are unique numbers(should not repeat)
-                    self.curr_measured.append(obj)
-                    self.curr_measured_dict[obj] = {"start_frame": obj.frames[-1]}
-        # Clear objects that are being timed but are not in the tracker anymore
-        for timed_obj in self.curr_measured:
-            if timed_obj not in tracker.objects:
-                # Remove from list and dict
-                self.curr_measured.remove(timed_obj)
-                del self.curr_measured_dict[timed_obj]
-        # Draw lines on frames
-        self.cv2.line(self.video.frame, self.left_line.point1, self.left_line.point2, (255, 0, 0), 2)
-        self.cv2.line(self.video.frame, self.right_line.point1, self.right_line.point2, (255, 0, 0), 2)
+            # If not tracked and between lines start timing it
+            elif in_area:
+                # Create object in dictionary, save start point(frame, time, center point)
+                self.curr_measured_dict[obj] = {"start": obj.point()}
+        # Objects that are being timed but are not in the tracker anymore can't be timed
+        for obj in events.lost:
+            self.curr_measured_dict.pop(obj, None)
+
+    def row(self, y) -> int:
+        """
+        Row of tables(dpp, left_x, right_x) of y value, clipped to the tables.
+        """
+        return min(max(int(y), 0), len(self.dpp) - 1)
+
+    def zones(self, points) -> tuple:
+        """
+        Checks where points are relative to lines, all at once with the tables of lines.
+        :param points: list or numpy.ndarray -> Points [(x, y), ...]
+        :return: tuple(numpy.ndarray, numpy.ndarray) -> (inside, outside), bool arrays, inside is True for points
+        between lines(timing area), outside for points left of both lines or right of both lines
+        """
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        rows = np.clip(points[:, 1], 0, len(self.dpp) - 1)
+        x, left_x, right_x = points[:, 0], self.left_x[rows], self.right_x[rows]
+        inside = (left_x <= x) & (x <= right_x)
+        outside = ((x <= left_x) & (x <= right_x)) | ((x > left_x) & (x > right_x))
+        return inside, outside
+
+    def gap(self, frames) -> None:
+        """
+        Receive from subject(ObjectDetection) that frames were missed, objects being timed can't be timed correctly
+        across the gap so they are dropped.
+        :param frames: int -> Number of missed frames
+        :return: None
+        """
+        self.curr_measured_dict = dict()
+
+    def close(self) -> None:
+        """
+        Receive from subject(ObjectDetection) that playing ended, queued data gets written to file. With more trackers
+        this gets called by each of them.
+        :return: None
+        """
+        with self._lock:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
 
     def set_distance(self, distance=None, save=False):
         """
@@ -506,7 +698,7 @@ class Radar(Observer):
             if save:
                 # Right and left line are set by now by the lines setter
                 data = {"lines": (tuple(self.left_line), tuple(self.right_line), self.distance)}
-                save_to_data_file(data)
+                save_to_data_file(data, self.video.data_file)
 
     def move_line(self):
         """ Todo Make function to move lines """
@@ -602,4 +794,4 @@ class Radar(Observer):
             if save:
                 # Right and left line are set by now by the lines setter
                 data = {"lines": (tuple(self.left_line), tuple(self.right_line), self.distance)}
-                save_to_data_file(data)
+                save_to_data_file(data, self.video.data_file)
@@ -0,0 +1,77 @@
+"""
+File consists of polygon regions(one per lane, ...) used by VideoPlayer and ObjectTracking. Every region is precomputed
+once into its bounding box inside roi and a mask of the polygon inside that box, detection then only runs on the
+bounding boxes of regions and only pixels inside the polygons get detected.
+"""
+import cv2
+import numpy as np
+
+
+def check_polygon(polygon) -> list:
+    """
+    Checks that polygon has at least 3 points (x, y).
+    :param polygon: list or tuple -> [(x1, y1), (x2, y2), (x3, y3), ...]
+    :return: list -> [[x1, y1], ...] so it can be saved in a json file
+    """
+    points = [[int(point[0]), int(point[1])] for point in polygon]
+    if len(points) < 3:
+        raise ValueError("Region polygon should have at least 3 points.")
+    return points
+
+
+def bounding_box(polygons) -> tuple:
+    """
+    Bounding box of all polygons.
+    :param polygons: list -> Polygons [[(x1, y1), ...], ...]
+    :return: tuple(x, y, w, h)
+    """
+    points = np.concatenate([np.asarray(polygon, dtype=np.int32) for polygon in polygons])
+    return tuple(int(value) for value in cv2.boundingRect(points))
+
+
+class Region:
+    """
+    Polygon region inside roi, box is the bounding box of polygon relative to roi(clipped to roi), mask is 255 inside
+    the polygon and 0 outside, of the size of box. Mask is None if the polygon fills its whole box(rectangle).
+    """
+    def __init__(self, polygon, roi):
+        """
+        :param polygon: list -> Points [(x1, y1), ...] in frame coordinates
+        :param roi: tuple(x, y, w, h) -> Roi of video
+        """
+        self.polygon = check_polygon(polygon)
+        xr, yr, wr, hr = roi
+        x, y, w, h = bounding_box([self.polygon])
+        # Relative to roi and clipped
+        x1, y1 = max(x - xr, 0), max(y - yr, 0)
+        x2, y2 = min(x + w - xr, wr), min(y + h - yr, hr)
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError("Region {} is outside of roi {}.".format(self.polygon, tuple(roi)))
+        self.box = (x1, y1, x2 - x1, y2 - y1)
+        mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+        points = np.asarray(self.polygon, dtype=np.int32) - (xr + x1, yr + y1)
+        cv2.fillPoly(mask, [points], 255)
+        self.mask = None if cv2.countNonZero(mask) == mask.size else mask
+        self.area = cv2.countNonZero(mask)
+
+    def crop(self, image):
+        """
+        Returns the part of image(roi) inside box.
+        :param image: numpy.ndarray -> Image of roi
+        :return: numpy.ndarray -> View of image
+        """
+        x, y, w, h = self.box
+        return image[y: y + h, x: x + w]
+
+    def apply_mask(self, mask):
+        """
+        Clears detected pixels outside of polygon.
+        :param mask: numpy.ndarray -> Binary mask of box
+        :return: numpy.ndarray
+        """
+        if self.mask is None:
+            return mask
+        return cv2.bitwise_and(mask, self.mask)
+
+    def __repr__(self) -> str:
+        return "Region(box: {}, points: {})".format(self.box, len(self.polygon))
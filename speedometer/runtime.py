@@ -0,0 +1,121 @@
+"""
+File consists of the MultiStreamRuntime class, which plays several VideoPlayer streams(each with its own ObjectTracking
+and Radar) in one process, sharing one pool of worker threads.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import os
+import threading
+
+
+class MultiStreamRuntime:
+    """
+    Plays several VideoPlayer objects at once. Each video gets a FrameGrabber thread reading its frames, frames get
+    processed(VideoPlayer -> ObjectTracking -> Radar) by a shared pool of worker threads. Streams are served round robin
+    and each stream has at most one frame being processed at a time, so frames of a stream are processed in order and
+    a busy camera can't starve the others. cv2 releases the GIL, so streams get processed on multiple cores.
+    Every stream keeps its own config, use a separate data_file for each VideoPlayer.
+    Videos have to be headless, cv2 windows can't be used from worker threads.
+    """
+    def __init__(self, workers=None):
+        """
+        :param workers: int -> Number of worker threads shared by all streams. Preset: None(number of cpus)
+        """
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.videos = []
+        self._stop_event = threading.Event()
+
+    def add(self, video) -> None:
+        """
+        Adds a video to the runtime, observers(ObjectTracking, Radar) should already be attached to it.
+        :param video: VideoPlayer
+        :return: None
+        """
+        if not video.headless:
+            raise ValueError("Videos played by MultiStreamRuntime have to be headless, set headless=True.")
+        self.videos.append(video)
+
+    def stop(self) -> None:
+        """
+        Stops all streams, can be called from another thread.
+        :return: None
+        """
+        self._stop_event.set()
+        for video in self.videos:
+            video.stop()
+
+    def _open_next(self, stream) -> bool:
+        """
+        Opens the next video path of stream and starts its grabber.
+        :param stream: dict -> State of stream
+        :return: bool -> False if stream has no more videos
+        """
+        video = stream["video"]
+        for video_path in stream["paths"]:
+            if video.stopped:
+                return False
+            cap = video.open_video(video_path)
+            if cap is None:
+                continue
+            video.grabber = video.create_grabber(cap, video_path)
+            video.grabber.start()
+            return True
+        return False
+
+    def run(self, timeout=None) -> None:
+        """
+        Plays all added videos until they end, stop is called or timeout runs out.
+        :param timeout: float -> Number of seconds after which all streams stop. Preset: None
+        :return: None
+        """
+        self._stop_event.clear()
+        streams = []
+        for video in self.videos:
+            video.reset_stop(timeout)
+            stream = {"video": video, "paths": iter(video.video_list), "future": None}
+            if self._open_next(stream):
+                streams.append(stream)
+        next_index = 0  # Stream served first in the next round
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                while streams and not self._stop_event.is_set():
+                    submitted = False
+                    for i in range(len(streams)):
+                        stream = streams[(next_index + i) % len(streams)]
+                        video = stream["video"]
+                        future = stream["future"]
+                        if future is not None:
+                            if not future.done():  # Previous frame of stream is still being processed
+                                continue
+                            stream["future"] = None
+                            if future.result():  # Raises exceptions from worker, True if stream should stop
+                                video.grabber.release()
+                                stream["done"] = True
+                                continue
+                        item = video.grabber.read(timeout=0)
+                        if item is None:
+                            if not video.grabber.running or video.stopped:
+                                video.grabber.release()
+                                if video.stopped or not self._open_next(stream):
+                                    stream["done"] = True
+                            continue
+                        stream["future"] = executor.submit(video.process_grabbed, item)
+                        submitted = True
+                    # Remove finished streams
+                    streams = [stream for stream in streams if not stream.get("done")]
+                    next_index = (next_index + 1) % max(len(streams), 1)
+                    if not submitted:
+                        # Nothing to do, wait for a worker to finish or for new frames
+                        pending = [stream["future"] for stream in streams if stream["future"] is not None]
+                        if pending:
+                            wait(pending, timeout=0.01, return_when=FIRST_COMPLETED)
+                        else:
+                            self._stop_event.wait(0.005)
+            finally:
+                for video in self.videos:
+                    video.stop()
+                for stream in streams:
+                    if stream["future"] is not None:
+                        stream["future"].result()
+                    stream["video"].grabber.release()
+                for video in self.videos:
+                    video.close()
@@ -0,0 +1,283 @@
+"""
+File consists of sinks measured data of Radar gets saved to by MeasurementWriter. Every sink gets rows in batches from
+the thread of writer:
+    - CsvSink: append only csv file, readable by anything but every value has to be parsed again when loading.
+    - SQLiteSink: SQLite database, indexed by end time, speed and direction so parts of long recordings can be queried.
+    - ColumnarSink: directory with one binary file per column of fixed type, whole columns load with np.fromfile.
+Sinks are registered by name in sinks, measured data of any of them can be loaded with load_measurements.
+"""
+import csv
+import json
+import os
+import sqlite3
+import numpy as np
+
+# Columns of measured data(in the order Radar saves them) and their types
+MEASUREMENT_COLUMNS = (("id", "int64"),
+                       ("start_time", "float64"),
+                       ("end_time", "float64"),
+                       ("time_diff", "float64"),
+                       ("x_dir", "int8"),
+                       ("y_dir", "int8"),
+                       ("start_frame", "int64"),
+                       ("end_frame", "int64"),
+                       ("frame_diff", "int64"),
+                       ("calculated_time", "float64"),
+                       ("calculated_distance", "float64"),
+                       ("speed_mps", "float64"),
+                       ("speed_kmh", "float64"),
+                       ("avg_size", "int64"))
+
+
+class Sink:
+    """
+    Base class of sinks, subclasses implement write, opened when created.
+    """
+    extension = None  # File extension of sink
+    errors = (OSError,)  # Errors of writing that MeasurementWriter recovers from(retries writing)
+
+    def __init__(self, filename, columns=MEASUREMENT_COLUMNS):
+        """
+        :param filename: str -> File(or directory) data gets saved to
+        :param columns: tuple(tuple(str, str), ...) -> Names and numpy types of columns. Preset: MEASUREMENT_COLUMNS
+        """
+        self.filename = filename
+        self.columns = tuple((name, np.dtype(dtype).name) for name, dtype in columns)
+
+    @property
+    def header(self) -> list:
+        return [name for name, _ in self.columns]
+
+    def write(self, rows) -> None:
+        """
+        Saves rows.
+        :param rows: list(list, ...) -> Rows with values in the order of columns
+        :return: None
+        """
+        raise NotImplementedError
+
+    def sync(self) -> None:
+        """
+        Writes saved data from the OS cache to storage.
+        """
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __repr__(self) -> str:
+        return "{}({})".format(type(self).__name__, self.filename)
+
+
+class CsvSink(Sink):
+    """
+    Appends rows to a csv file, header is written if the file is new.
+    """
+    extension = ".csv"
+
+    def __init__(self, filename, columns=MEASUREMENT_COLUMNS):
+        super().__init__(filename, columns)
+        new = not os.path.exists(filename) or os.path.getsize(filename) == 0
+        self._file = open(filename, mode='a', newline="")
+        self._writer = csv.writer(self._file, delimiter=',')
+        if new:
+            self._writer.writerow(self.header)
+            self._file.flush()
+
+    def write(self, rows) -> None:
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SQLiteSink(Sink):
+    """
+    Inserts rows to a table of an SQLite database, the table has indices on end_time, speed_kmh and direction(x_dir,
+    y_dir). Every batch is one transaction.
+    """
+    extension = ".db"
+    errors = (OSError, sqlite3.Error)
+    # Types of sqlite columns for numpy types
+    types = {"i": "INTEGER", "u": "INTEGER", "b": "INTEGER", "f": "REAL"}
+
+    def __init__(self, filename, columns=MEASUREMENT_COLUMNS, table="measurements"):
+        """
+        :param filename: str -> Database file
+        :param columns: tuple(tuple(str, str), ...) -> Names and numpy types of columns. Preset: MEASUREMENT_COLUMNS
+        :param table: str -> Name of table. Preset: "measurements"
+        """
+        super().__init__(filename, columns)
+        self.table = table
+        # Writing is done by the thread of writer, only one thread uses the connection at a time
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")  # Readers don't block writing while recording
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS {} ({})".format(table, ", ".join(
+                "{} {}".format(name, self.types.get(np.dtype(dtype).kind, "TEXT")) for name, dtype in self.columns)))
+            for name, index_columns in (("end_time", "end_time"), ("speed", "speed_kmh"),
+                                        ("direction", "x_dir, y_dir")):
+                if all(column in self.header for column in index_columns.split(", ")):
+                    self.connection.execute("CREATE INDEX IF NOT EXISTS {0}_{1} ON {0} ({2})".format(
+                        table, name, index_columns))
+        self._insert = "INSERT INTO {} ({}) VALUES ({})".format(table, ", ".join(self.header),
+                                                                ", ".join("?" * len(self.columns)))
+        # Values get converted to python types, sqlite can't store numpy types
+        self._converters = [int if np.dtype(dtype).kind in "iub" else float for _, dtype in self.columns]
+
+    def write(self, rows) -> None:
+        with self.connection:
+            self.connection.executemany(self._insert, ([convert(value) for convert, value in
+                                                        zip(self._converters, row)] for row in rows))
+
+    def sync(self) -> None:
+        # Moves the write ahead log to the database file and syncs it
+        self.connection.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def read(self, where=None, params=()) -> dict:
+        """
+        Loads rows of table, filtered by an sql condition which can use the indices.
+        :param where: str -> Sql condition, e.g. "end_time BETWEEN ? AND ?". Preset: None(all rows)
+        :param params: tuple -> Values of ? in where
+        :return: dict(str: numpy.ndarray) -> Column name: values
+        """
+        query = "SELECT {} FROM {}".format(", ".join(self.header), self.table)
+        if where:
+            query += " WHERE " + where
+        rows = self.connection.execute(query, params).fetchall()
+        # All values fit in float64 exactly(ids, frames and times included), columns then get their own type
+        values = np.array(rows, dtype=np.float64).reshape(-1, len(self.columns))
+        return {name: values[:, i].astype(dtype) for i, (name, dtype) in enumerate(self.columns)}
+
+
+class ColumnarSink(Sink):
+    """
+    Appends rows to a directory with one raw binary file per column(name.bin) of its numpy type, types are saved in
+    columns.json. Columns load directly into numpy arrays without parsing.
+    """
+    extension = ".cols"
+
+    def __init__(self, filename, columns=MEASUREMENT_COLUMNS):
+        super().__init__(filename, columns)
+        os.makedirs(filename, exist_ok=True)
+        schema_file = os.path.join(filename, "columns.json")
+        if os.path.exists(schema_file):
+            saved = read_schema(filename)
+            if saved != self.columns:
+                raise ValueError("Columns of {} don't match the saved columns: {}".format(filename, saved))
+        else:
+            with open(schema_file, 'w') as file:
+                json.dump({"columns": self.columns}, file)
+        self._files = [open(os.path.join(filename, name + ".bin"), mode='ab') for name in self.header]
+
+    def write(self, rows) -> None:
+        for i, ((_, dtype), file) in enumerate(zip(self.columns, self._files)):
+            np.array([row[i] for row in rows], dtype=dtype).tofile(file)
+            file.flush()
+
+    def sync(self) -> None:
+        for file in self._files:
+            file.flush()
+            os.fsync(file.fileno())
+
+    def close(self) -> None:
+        for file in self._files:
+            file.close()
+
+
+def read_schema(directory) -> tuple:
+    """
+    Reads columns of a ColumnarSink directory.
+    :param directory: str
+    :return: tuple(tuple(str, str), ...) -> Names and numpy types of columns
+    """
+    with open(os.path.join(directory, "columns.json"), 'r') as file:
+        return tuple((name, dtype) for name, dtype in json.load(file)["columns"])
+
+
+def read_columnar(directory) -> dict:
+    """
+    Loads all columns of a ColumnarSink directory, if writing was interrupted columns are cut to the shortest one.
+    :param directory: str
+    :return: dict(str: numpy.ndarray) -> Column name: values
+    """
+    columns = {name: np.fromfile(os.path.join(directory, name + ".bin"), dtype=dtype)
+               for name, dtype in read_schema(directory)}
+    length = min((len(values) for values in columns.values()), default=0)
+    return {name: values[:length] for name, values in columns.items()}
+
+
+def read_sqlite(filename, where=None, params=(), table="measurements") -> dict:
+    """
+    Loads rows of an SQLiteSink database with columns of the types of MEASUREMENT_COLUMNS.
+    :param filename: str -> Database file
+    :param where: str -> Sql condition, e.g. "speed_kmh > ?". Preset: None(all rows)
+    :param params: tuple -> Values of ? in where
+    :param table: str -> Name of table. Preset: "measurements"
+    :return: dict(str: numpy.ndarray) -> Column name: values
+    """
+    if not os.path.exists(filename):
+        raise ValueError("Given path does not exists: {}".format(filename))
+    sink = SQLiteSink(filename, table=table)
+    try:
+        return sink.read(where, params)
+    finally:
+        sink.close()
+
+
+def read_csv(filename) -> dict:
+    """
+    Loads a csv file written by CsvSink, every value gets parsed.
+    :param filename: str
+    :return: dict(str: numpy.ndarray) -> Column name: values
+    """
+    types = dict(MEASUREMENT_COLUMNS)
+    with open(filename, 'r', newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        rows = list(reader)
+    return {name: np.array([row[i] for row in rows], dtype=np.float64).astype(types.get(name, "float64"))
+            for i, name in enumerate(header)}
+
+
+def load_measurements(path, where=None, params=()) -> dict:
+    """
+    Loads measured data saved by any sink, type of sink is given by extension of path.
+    :param path: str -> .csv file, .db(SQLite) file or .cols(columnar) directory
+    :param where: str -> Sql condition, only used for SQLite files. Preset: None(all rows)
+    :param params: tuple -> Values of ? in where
+    :return: dict(str: numpy.ndarray) -> Column name: values
+    """
+    if path.endswith(ColumnarSink.extension):
+        return read_columnar(path)
+    if path.endswith(SQLiteSink.extension) or path.endswith(".sqlite"):
+        return read_sqlite(path, where, params)
+    return read_csv(path)
+
+
+# Registered sinks, name: class or function returning a Sink when called with filename
+sinks = {"csv": CsvSink,
+         "sqlite": SQLiteSink,
+         "columnar": ColumnarSink}
+
+
+def create_sink(name, filename, **kwargs) -> Sink:
+    """
+    Creates a registered sink.
+    :param name: str -> Name of sink
+    :param filename: str -> File(or directory) data gets saved to
+    :param kwargs: Parameters of sink
+    :return: Sink
+    """
+    if name not in sinks:
+        raise ValueError("Sink set incorrectly. Should be one of: {}".format(", ".join(sinks)))
+    return sinks[name](filename, **kwargs)
@@ -0,0 +1,163 @@
+"""
+File consists of the StreamSource class, a cv2.VideoCapture wrapper which reconnects to live streams with exponential
+backoff and keeps track of the frames missed while reconnecting.
+"""
+import os
+import threading
+import time
+import cv2
+
+
+class StreamSource:
+    """
+    Wraps cv2.VideoCapture, has the same read/grab/get/set/isOpened/release methods. When reading from a live stream
+    fails, the capture gets re-created with exponential backoff between attempts instead of right away. Files are never
+    reconnected, a failed read is the end of video.
+    Every read frame gets a timestamp(unix time) from the source: capture time for live streams, position of frame in
+    video(CAP_PROP_POS_MSEC) added to the start time of video for files. So files can be processed faster than real
+    time and still get correct times.
+    Health states:
+        - "connecting": capture is being opened for the first time
+        - "healthy": frames are being read
+        - "reconnecting": reading failed, waiting for the stream to come back
+        - "failed": max_reconnects attempts failed, no more frames will be read
+        - "closed": capture was released or stopped
+    """
+    def __init__(self, video_path, live=True, fps=None, reconnect_delay=0.5, max_reconnect_delay=30,
+                 max_reconnects=None, stop_event=None, start_timestamp=None):
+        """
+        :param video_path: str or int -> Path, stream url or camera index passed to cv2.VideoCapture
+        :param live: bool -> If video_path is a live stream that should be reconnected. Preset: True
+        :param fps: int -> Frames Per Second of stream, used to calculate missed frames while reconnecting.
+        :param reconnect_delay: float -> Seconds waited before the first reconnect attempt. Preset: 0.5
+        :param max_reconnect_delay: float -> Maximum seconds waited between reconnect attempts. Preset: 30
+        :param max_reconnects: int -> Number of failed attempts in a row after which the stream is given up.
+        Preset: None(never give up)
+        :param stop_event: threading.Event -> When set, waiting for a reconnect stops and reading returns False.
+        :param start_timestamp: float -> Unix time of the first frame of a video file. Preset: None(modification time
+        of file minus the length of video, as recordings are modified last when they end)
+        """
+        self.video_path = video_path
+        self.live = live
+        self.fps = fps
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_reconnects = max_reconnects
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.state = "connecting"
+        self.reconnects = 0  # Number of successful reconnects
+        self.missed_frames = 0  # Total number of frames missed while reconnecting
+        self._gap = 0  # Frames missed since last pop_gap call
+        self._last_read_time = None
+        self.cap = cv2.VideoCapture(video_path)
+        self.timestamp = None  # Timestamp of the last read frame
+        self.start_timestamp = start_timestamp
+        if self.start_timestamp is None and not self.live:
+            self.start_timestamp = self.file_start_timestamp()
+
+    def file_start_timestamp(self) -> float:
+        """
+        Estimates the unix time of the first frame of a video file from its modification time and length.
+        :return: float
+        """
+        modified = os.path.getmtime(self.video_path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        frame_count = self.cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        if fps > 0 and frame_count > 0:
+            return modified - frame_count / fps
+        return modified
+
+    def isOpened(self) -> bool:
+        return self.state not in ("failed", "closed") and self.cap.isOpened()
+
+    def get(self, prop_id):
+        return self.cap.get(prop_id)
+
+    def set(self, prop_id, value):
+        return self.cap.set(prop_id, value)
+
+    def retrieve(self):
+        return self.cap.retrieve()
+
+    def read(self):
+        """
+        Reads next frame, reconnects if reading from a live stream fails.
+        :return: tuple(bool, numpy.ndarray) -> (ret, frame), ret is False at the end of video or if stream is closed
+        """
+        return self._read(lambda: self.cap.read())
+
+    def grab(self) -> bool:
+        """
+        Grabs next frame without converting it to an image, reconnects if grabbing from a live stream fails.
+        :return: bool
+        """
+        return self._read(lambda: (self.cap.grab(), None))[0]
+
+    def _read(self, read):
+        """
+        Calls read on capture, reconnects live streams until reading succeeds, is stopped or max_reconnects is reached.
+        :param read: callable -> Returns (ret, frame)
+        :return: tuple(bool, numpy.ndarray)
+        """
+        if self.state in ("failed", "closed"):
+            return False, None
+        ret, frame = read()
+        if not ret:
+            if not self.live:  # End of video
+                return False, None
+            failed_since = self._last_read_time if self._last_read_time is not None else time.time()
+            attempts = 0
+            while not ret:
+                if not self.reconnect(attempts):
+                    return False, None
+                attempts += 1
+                ret, frame = read() if self.cap.isOpened() else (False, None)
+            self.reconnects += 1
+            print("Stream reconnected after {} attempt(s).".format(attempts))
+            # Frames that would have been read while the stream was down
+            if self.fps:
+                gap = max(int(round((time.time() - failed_since) * self.fps)) - 1, 0)
+                self._gap += gap
+                self.missed_frames += gap
+        self.state = "healthy"
+        self._last_read_time = time.time()
+        if self.live:
+            self.timestamp = self._last_read_time
+        else:
+            self.timestamp = self.start_timestamp + self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        return ret, frame
+
+    def reconnect(self, attempts) -> bool:
+        """
+        Waits with exponential backoff, then re-creates capture.
+        :param attempts: int -> Number of failed attempts in a row so far
+        :return: bool -> False if stopped while waiting or max_reconnects was reached
+        """
+        if self.max_reconnects is not None and attempts >= self.max_reconnects:
+            self.state = "failed"
+            print("Giving up on stream after {} reconnect attempts.".format(attempts))
+            return False
+        self.state = "reconnecting"
+        delay = min(self.reconnect_delay * 2 ** attempts, self.max_reconnect_delay)
+        print("Stream lost, reconnecting in {}s ...".format(round(delay, 2)))
+        if self.stop_event.wait(delay):
+            self.state = "closed"
+            return False
+        self.cap.release()
+        self.cap = cv2.VideoCapture(self.video_path)
+        return True
+
+    def pop_gap(self) -> int:
+        """
+        Returns the number of frames missed since the last call and resets it.
+        :return: int
+        """
+        gap, self._gap = self._gap, 0
+        return gap
+
+    def release(self) -> None:
+        """
+        Releases capture
+        """
+        self.state = "closed"
+        self.cap.release()
@@ -4,8 +4,14 @@
 """
 from speedometer.Observer import Subject, Observer
 from speedometer.helper_functions import open_data_file, save_to_data_file, mmss_to_frames
+from speedometer.frame_grabber import FrameGrabber
+from speedometer.stream import StreamSource
+from speedometer.regions import check_polygon, bounding_box
+from concurrent.futures import ThreadPoolExecutor
 
 import json
+import math
+import threading
 import time
 import cv2
 import os
@@ -16,7 +22,11 @@ class VideoPlayer(Subject):
     VideoPlayer class plays set videos in video_path using cv2, has methods for setting roi, recording certain parts of
     videos, ...
     """
-    def __init__(self, video_path, fps=None, roi=None, resize=(640, 360), rotate=None, display=True):
+    def __init__(self, video_path, fps=None, roi=None, resize=(640, 360), rotate=None, display=True, threaded=False,
+                 buffer_size=2, buffer_policy=None, headless=False,
+                 interpolation="cubic", crop_first=False, frame_stride=1, adaptive_stride=False, max_stride=None,
+                 reconnect_delay=0.5, max_reconnect_delay=30, max_reconnects=None, data_file="saved_data.json",
+                 start_timestamp=None, regions=None, observer_threads=None):
         """
         :param video_path: str or list -> Video to be played, can be: rtsp url, video path or folder path, in case of
         folder path, the player will play each file in the directory.
@@ -27,6 +37,39 @@ class VideoPlayer(Subject):
         :param rotate: str -> If image needs to be rotated, possible: '90c'(90degrees clockwise),
         '90cc'(90 degrees counterclockwise), '180'(180 degrees).
         :param display: bool -> If the video frame should be displayed.
+        :param threaded: bool -> If frames should be read by a separate thread into a bounded buffer(FrameGrabber), so
+        processing always runs on the freshest frame. Preset: False
+        :param buffer_size: int -> Maximum number of frames in the buffer when threaded. Preset: 2
+        :param buffer_policy: str -> What happens when the buffer is full, possible: "drop_oldest", "block". If None
+        live streams use "drop_oldest" and files use "block".
+        :param headless: bool -> Headless mode, nothing gets drawn or displayed and no cv2 GUI functions get called
+        (imshow, waitKey), also by the observers. Stop playing with the stop method or the timeout param. of play.
+        Preset: False
+        :param interpolation: str -> Interpolation used for resizing frames, possible: 'nearest', 'linear', 'area',
+        'cubic'. Preset: 'cubic'
+        :param crop_first: bool -> If the roi should be cropped from the frame at source resolution and only the roi
+        resized, the whole frame then only gets resized if it is displayed. Preset: False
+        :param frame_stride: int -> Only every Nth frame gets processed(passed to observers), frame numbers still count
+        every frame of video so timing stays correct. Preset: 1
+        :param adaptive_stride: bool -> If the stride should be raised when the moving average processing time of a
+        frame exceeds the time per frame(1/fps), and lowered back to frame_stride once it keeps up. Preset: False
+        :param max_stride: int -> Upper limit for the adaptive stride. Preset: None(fps, process at least 1 frame/s)
+        :param reconnect_delay: float -> Seconds waited before reconnecting to a lost live stream, doubles with every
+        failed attempt. Preset: 0.5
+        :param max_reconnect_delay: float -> Maximum seconds waited between reconnect attempts. Preset: 30
+        :param max_reconnects: int -> Failed reconnect attempts in a row after which a stream is given up.
+        Preset: None(never give up)
+        :param data_file: str -> Json file roi and lines get saved to/loaded from, use one per camera when running
+        more cameras. Preset: "saved_data.json"
+        :param start_timestamp: float -> Unix time of the first frame of video files, frame times are this plus the
+        position of frame in video. Preset: None(modification time of file minus the length of video)
+        :param regions: list -> Polygons [[(x1, y1), (x2, y2), (x3, y3), ...], ...] in coordinates of the resized frame,
+        e.g. one per lane, detection only runs inside them. If roi isn't set it is the bounding box of all regions.
+        Loaded from data_file if None. Preset: None
+        :param observer_threads: int -> Number of threads observers(e.g. one ObjectTracking per lane) get notified in,
+        all observers then process a frame at the same time, OpenCV releases the GIL while detecting. Observers
+        shouldn't display anything(display=False) as cv2 windows only work from the main thread.
+        Preset: None(observers are notified one after another)
         """
         self.observers: list = []
         self.cv2 = cv2
@@ -38,26 +81,59 @@ class VideoPlayer(Subject):
         self._fps = fps
         self.width = None
         self.height = None
-        # Check if saved_data.json exists, otherwise create it --> load roi if exists, else set to None
-        if not os.path.exists("saved_data.json"):
-            with open('saved_data.json', 'w') as data_file:
+        # Check if data_file exists, otherwise create it --> load roi if it isn't passed
+        self.data_file = data_file
+        if not os.path.exists(self.data_file):
+            with open(self.data_file, 'w') as file:
                 data = {"roi": None}
-                json.dump(data, data_file)
-            self.roi = None
-        else:
-            if roi is None:
-                # Check if global roi variable exists
-                saved_data = open_data_file()
-                if saved_data["roi"] is not None:
-                    self.roi = saved_data["roi"]
-                else:
-                    self.roi = roi
+                json.dump(data, file)
+        if roi is None:
+            # Check if global roi variable exists
+            roi = open_data_file(self.data_file).get("roi")
+        self.roi = roi
         self.resize = resize
         self.width, self.height = self.resize
-        self.display = display
+        if regions is None:
+            regions = open_data_file(self.data_file).get("regions")
+        self.regions = regions
+        if self.roi is None and self.regions:
+            self.roi = self.regions_roi()
+        self.headless = headless
+        self.display = display and not headless
         self._rotate = rotate
+        self.interpolation = interpolation
+        self.crop_first = crop_first
+        self._source_roi = None  # Roi mapped to source resolution, (source_shape, roi, (x1, y1, x2, y2))
+        # Threaded capture settings
+        self.threaded = threaded
+        self.buffer_size = buffer_size
+        self.buffer_policy = buffer_policy
+        self.grabber = None  # FrameGrabber, gets set when video is playing and threaded is set to True
+        # Frame stride, stride is the current one which changes if adaptive_stride is set
+        self.frame_stride = frame_stride
+        self.adaptive_stride = adaptive_stride
+        self.max_stride = max_stride
+        self.stride = frame_stride
+        self.processing_latency = None  # Moving average of the time(s) spent processing a frame
+        # Observers notified in a thread pool
+        self.observer_threads = observer_threads
+        self._executor = None  # ThreadPoolExecutor, created when first needed and shut down when playing ends
+        self.frame_step = 1  # Number of frames between the last two processed frames
+        self._last_processed_frame = None
+        # Reconnecting live streams
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_reconnects = max_reconnects
+        self.source = None  # StreamSource of the video currently playing
+        self.start_timestamp = start_timestamp
+        # Stopping, set by the stop method or when the timeout of play runs out
+        self._stop_event = threading.Event()
+        self._deadline = None
+        self._end_frame = None
         # Gets set when video is playing
         self.frame = None
+        self.timestamp = None  # Unix time the current frame was captured at, given by source
+        self.roi_frame = None  # Part of frame inside roi, this is what observers process
         self.ret = None
         self.current_video_name = None
 
@@ -75,11 +151,37 @@ class VideoPlayer(Subject):
 
     def notify(self) -> None:
         """
-        Notify all observers, mid video
+        Notify all observers, mid video. With observer_threads they run in a thread pool and this returns once all of
+        them processed the frame.
         """
+        if self.observer_threads and len(self.observers) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.observer_threads)
+            # Result re-raises exceptions of observers
+            for future in [self._executor.submit(observer.update) for observer in self.observers]:
+                future.result()
+            return
         for observer in self.observers:
             observer.update()
 
+    def gap(self, frames) -> None:
+        """
+        Notify all observers that frames were missed while the stream was reconnecting
+        :param frames: int -> Number of missed frames
+        """
+        for observer in self.observers:
+            observer.gap(frames)
+
+    def close(self) -> None:
+        """
+        Notify all observers that playing ended
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for observer in self.observers:
+            observer.close()
+
     @property
     def video_list(self) -> list:
         return self._video_list
@@ -157,9 +259,46 @@ class VideoPlayer(Subject):
         else:
             raise ValueError("Rotation degrees set incorrectly. Should be one of: None, '90c', '90cc', '180'")
 
+    @property
+    def interpolation(self):
+        return self._interpolation
+
+    @interpolation.setter
+    def interpolation(self, interpolation):
+        """
+        Setter for interpolation used when resizing frames.
+        :param interpolation: str
+        :return: None
+        """
+        possible_interpolations = {"nearest": self.cv2.INTER_NEAREST,
+                                   "linear": self.cv2.INTER_LINEAR,
+                                   "area": self.cv2.INTER_AREA,
+                                   "cubic": self.cv2.INTER_CUBIC}
+        if interpolation in possible_interpolations.keys():
+            self._interpolation = possible_interpolations[interpolation]
+        else:
+            raise ValueError("Interpolation set incorrectly. Should be one of: 'nearest', 'linear', 'area', 'cubic'")
+
+    def source_roi(self, frame):
+        """
+        Maps roi(set on the resized frame) back to the resolution of the source frame.
+        :param frame: numpy.ndarray -> Frame at source resolution
+        :return: tuple(x1, y1, x2, y2) -> Upper left and bottom right corner of roi on source frame
+        """
+        shape = frame.shape[:2]
+        # Only calculated again when source size or roi change
+        if self._source_roi is None or self._source_roi[0] != shape or self._source_roi[1] != tuple(self.roi):
+            source_height, source_width = shape
+            scale_x, scale_y = source_width / self.width, source_height / self.height
+            xr, yr, wr, hr = self.roi
+            corners = (int(round(xr * scale_x)), int(round(yr * scale_y)),
+                       int(round((xr + wr) * scale_x)), int(round((yr + hr) * scale_y)))
+            self._source_roi = (shape, tuple(self.roi), corners)
+        return self._source_roi[2]
+
     def select_roi(self, **kwargs):
         """  TODO cv2.roi prints command description after selection, should get rid of it, fix so seconds can get passed
-        Opens video with a ROI selector on given frame or time set in kwargs, saves the selection to saved_data.json
+        Opens video with a ROI selector on given frame or time set in kwargs, saves the selection to data_file
         :param kwargs: int frames=, int min=, int min= and int sec=
         :return: None
         """
@@ -186,68 +325,321 @@ class VideoPlayer(Subject):
         if "save" in keys:
             # if set to True --> save to globals.json
             if kwargs["save"]:
-                save_to_data_file({"roi": self.roi})
+                save_to_data_file({"roi": self.roi}, self.data_file)
         cap.release()
         self.cv2.destroyAllWindows()
 
-    def play(self, start_seconds=None):
+    @property
+    def regions(self):
+        return self._regions
+
+    @regions.setter
+    def regions(self, regions) -> None:
         """
-        Starts video, displays windows if set to true.
+        Setter for regions, checks that every polygon has at least 3 points.
+        :param regions: list or None
         :return: None
         """
-        for video_path in self.video_list:
-            cap = self.cv2.VideoCapture(video_path)
-            # Get first frames to extract size
-            _, self.frame = cap.read()
-            # Check if start_seconds is set, open at that second
-            if start_seconds is not None:
-                # Calculate frame
-                frame_to_start = start_seconds * self.fps
-                # Set video at that frame
-                cap.set(1, frame_to_start - 1)
-
-            # If rotate is set -> rotate image
-            if self.rotate is not None:
-                self.frame = self.cv2.rotate(self.frame, self.rotate)
-            # Resize frame and get dimensions
-            self.frame = self.cv2.resize(self.frame, self.resize, fx=0, fy=0, interpolation=cv2.INTER_CUBIC)
-            height, width, _ = self.frame.shape
-            # Set roi
-            if self.roi is None:
-                self.roi = (0, 0, width, height)  # x, y, w, h
+        self._regions = [check_polygon(polygon) for polygon in regions] if regions else None
 
-            while cap.isOpened():
-                self.frames += 1
-                self.ret, self.frame = cap.read()
+    def regions_roi(self) -> tuple:
+        """
+        Bounding box of all regions clipped to the resized frame.
+        :return: tuple(x, y, w, h)
+        """
+        x, y, w, h = bounding_box(self.regions)
+        x1, y1 = max(x, 0), max(y, 0)
+        x2, y2 = min(x + w, self.width), min(y + h, self.height)
+        return x1, y1, x2 - x1, y2 - y1
 
-                if not self.ret:
-                    # Re initialize cap
-                    cap = self.cv2.VideoCapture(video_path)
-                    self.frames += 1
-                    print("Frame skipped ...")
-                    continue
+    def set_regions(self, regions, save=False, set_roi=True) -> None:
+        """
+        Sets polygon regions detection runs in.
+        :param regions: list -> Polygons [[(x1, y1), (x2, y2), (x3, y3), ...], ...] in coordinates of the resized frame
+        :param save: bool -> If regions(and roi) should get saved to data_file. Preset: False
+        :param set_roi: bool -> If roi should be set to the bounding box of regions, so no pixels outside of them get
+        processed. Preset: True
+        :return: None
+        """
+        self.regions = regions
+        if set_roi and self.regions:
+            self.roi = self.regions_roi()
+        if save:
+            data = {"regions": self.regions}
+            if set_roi:
+                data["roi"] = self.roi
+            save_to_data_file(data, self.data_file)
+
+    def stop(self) -> None:
+        """
+        Stops playing the video after the current frame, can be called from another thread or from an observer.
+        :return: None
+        """
+        self._stop_event.set()
 
-                # If rotate is set -> rotate image
-                if self.rotate is not None:
-                    self.frame = self.cv2.rotate(self.frame, self.rotate)
+    @property
+    def stopped(self) -> bool:
+        """
+        True if stop was called, the timeout set in play ran out or end_seconds of play was reached.
+        """
+        if not self._stop_event.is_set() and self._deadline is not None and time.time() >= self._deadline:
+            self._stop_event.set()
+        if not self._stop_event.is_set() and self._end_frame is not None and self.frames + 1 >= self._end_frame:
+            self._stop_event.set()
+        return self._stop_event.is_set()
 
-                if self.frame is None:  # End of video
+    def reset_stop(self, timeout=None, end_seconds=None) -> None:
+        """
+        Clears a previous stop and sets when playing should stop, called before playing starts.
+        :param timeout: float -> Number of seconds after which playing stops, plays until the end or stop if None.
+        :param end_seconds: int or float -> Second of video to stop playing at, the frame at end_seconds is not played.
+        :return: None
+        """
+        self._stop_event.clear()
+        self._deadline = None if timeout is None else time.time() + timeout
+        self._end_frame = None if end_seconds is None else int(round(end_seconds * self.fps))
+
+    def open_video(self, video_path, start_seconds=None):
+        """
+        Opens video_path, reads the first frame to set the roi if it isn't set and seeks to start_seconds.
+        :param video_path: str or int -> Video file, stream url or camera index
+        :param start_seconds: int or float -> Second of video to start playing at, frames then count from that frame.
+        :return: StreamSource or None if no frame could be read
+        """
+        cap = self.open_source(video_path)
+        self.source = cap
+        # Get first frames to extract size
+        self.ret, self.frame = cap.read()
+        if not self.ret:  # Could not be opened or stopped while connecting
+            cap.release()
+            return None
+        # Check if start_seconds is set, open at that second
+        if start_seconds is not None:
+            # Calculate frame
+            frame_to_start = int(round(start_seconds * self.fps))
+            # Set video at that frame, the next read frame is counted as frame_to_start
+            cap.set(self.cv2.CAP_PROP_POS_FRAMES, frame_to_start)
+            self.frames = frame_to_start - 1
+
+        # If rotate is set -> rotate image
+        if self.rotate is not None:
+            self.frame = self.cv2.rotate(self.frame, self.rotate)
+        # Resize frame and get dimensions
+        self.frame = self.cv2.resize(self.frame, self.resize, fx=0, fy=0, interpolation=self.interpolation)
+        height, width, _ = self.frame.shape
+        # Set roi
+        if self.roi is None:
+            self.roi = (0, 0, width, height)  # x, y, w, h
+        return cap
+
+    def play(self, start_seconds=None, timeout=None, end_seconds=None):
+        """
+        Starts video, displays windows if set to true.
+        :param start_seconds: int or float -> Second of video to start playing at, frames then count from that frame.
+        :param timeout: float -> Number of seconds after which playing stops, plays until the end or stop if None.
+        :param end_seconds: int or float -> Second of video to stop playing at, the frame at end_seconds is not played.
+        :return: None
+        """
+        self.reset_stop(timeout, end_seconds)
+        try:
+            for video_path in self.video_list:
+                if self.stopped:
                     break
+                cap = self.open_video(video_path, start_seconds)
+                if cap is None:
+                    continue
 
-                # Resize frame --> faster obj. detection/tracking
-                self.frame = self.cv2.resize(self.frame, self.resize, fx=0, fy=0, interpolation=cv2.INTER_CUBIC)
+                if self.threaded:
+                    self.play_threaded(cap, video_path)
+                    continue
 
-                # Notify observers
-                self.notify()
-                # Display windows if set to true
-                if self.display:
-                    self.cv2.imshow("Video", self.frame)
-                # Pressing Esc key to stop
-                key = cv2.waitKey(1)
-                if key == 27:
+                while cap.isOpened() and not self.stopped:
+                    self.frames += 1
+                    if self.frame_due(self.frames):
+                        self.ret, self.frame = cap.read()
+                    else:
+                        # Frame won't be processed, grab skips converting it to an image
+                        self.ret, self.frame = cap.grab(), None
+
+                    if not self.ret:  # End of video, stream was given up or stopped while reconnecting
+                        self.frames -= 1  # Nothing was read
+                        break
+
+                    # Frames missed while the stream was reconnecting are counted, so frames stay in step with time
+                    missed = cap.pop_gap()
+                    if missed:
+                        self.frames += missed
+                        self.gap(missed)
+
+                    if self.frame is None:  # Skipped by stride
+                        continue
+
+                    self.timestamp = cap.timestamp
+                    if self.process_frame(self.frame):
+                        break
+
+                cap.release()
+        finally:
+            self.close()
+
+    def play_threaded(self, cap, video_path):
+        """
+        Plays video from cap, frames get read by a FrameGrabber on a separate thread. Frame numbers are set by the
+        grabber, so they stay correct for observers even when frames are dropped.
+        :param cap: StreamSource -> Opened capture of video_path
+        :param video_path: str or int -> Path the capture was opened from
+        :return: None
+        """
+        self.grabber = self.create_grabber(cap, video_path)
+        self.grabber.start()
+        try:
+            while True:
+                item = self.grabber.read(timeout=0.5)
+                if item is None:
+                    if self.grabber.running and not self.stopped:  # Nothing read yet, check again
+                        continue
+                    break  # End of video
+                if self.process_grabbed(item):
                     break
+        finally:
+            self.grabber.release()
 
-            cap.release()
+    def create_grabber(self, cap, video_path):
+        """
+        Creates a FrameGrabber for cap, the buffer policy depends on if video_path is a live stream if not set.
+        :param cap: StreamSource -> Opened capture of video_path
+        :param video_path: str or int -> Path the capture was opened from
+        :return: FrameGrabber
+        """
+        policy = self.buffer_policy
+        if policy is None:  # Live streams should always run on the freshest frame, files should not lose any
+            policy = "drop_oldest" if self.is_live(video_path) else "block"
+        return FrameGrabber(cap, buffer_size=self.buffer_size, policy=policy, start_frame=self.frames)
+
+    def process_grabbed(self, item):
+        """
+        Processes a frame read by FrameGrabber, frames skipped by stride only update the frame number.
+        :param item: GrabbedFrame -> (frame_number, timestamp, frame, gap)
+        :return: bool -> True if playing should stop
+        """
+        self.frames, self.timestamp, self.frame, missed = item
+        self.ret = True
+        if missed:
+            self.gap(missed)
+        if not self.frame_due(self.frames):  # Skipped by stride
+            return self.stopped
+        return self.process_frame(self.frame)
+
+    def process_frame(self, frame):
+        """
+        Rotates and resizes the read frame, notifies observers and displays it.
+        :param frame: numpy.ndarray -> Frame as read from capture
+        :return: bool -> True if playing should stop(Esc key was pressed or stop was called)
+        """
+        start_time = time.time()
+        self.frame, self.roi_frame = self.preprocess(frame)
+        return self.observe(start_time)
+
+    def preprocess(self, frame, out=None):
+        """
+        Rotates frame and resizes it, if crop_first is set only the roi gets resized.
+        :param frame: numpy.ndarray -> Frame as read from capture
+        :param out: numpy.ndarray -> Array the resized frame(or roi if crop_first) gets written to. Preset: None
+        :return: tuple(numpy.ndarray, numpy.ndarray) -> (frame, roi_frame), frame is None if crop_first is set and
+        frame isn't displayed
+        """
+        # If rotate is set -> rotate image
+        if self.rotate is not None:
+            frame = self.cv2.rotate(frame, self.rotate)
+
+        xr, yr, wr, hr = self.roi
+        if self.crop_first:
+            # Crop roi at source resolution and only resize the roi, coordinates match the resized frame
+            x1, y1, x2, y2 = self.source_roi(frame)
+            roi_frame = self.cv2.resize(frame[y1: y2, x1: x2], (wr, hr), dst=out, interpolation=self.interpolation)
+            # Whole frame is only needed for displaying
+            frame = self.cv2.resize(frame, self.resize, interpolation=self.interpolation) if self.display else None
+        else:
+            # Resize frame --> faster obj. detection/tracking
+            frame = self.cv2.resize(frame, self.resize, dst=out, interpolation=self.interpolation)
+            roi_frame = frame[yr: yr + hr, xr: xr + wr]
+        return frame, roi_frame
+
+    def observe(self, start_time=None):
+        """
+        Notifies observers of the preprocessed frame and roi_frame and displays it.
+        :param start_time: float -> Time processing of frame started, used for the adaptive stride. Preset: None(now)
+        :return: bool -> True if playing should stop(Esc key was pressed or stop was called)
+        """
+        if start_time is None:
+            start_time = time.time()
+        # Number of frames since the last processed one, observers need it when frames get skipped
+        if self._last_processed_frame is not None:
+            self.frame_step = max(self.frames - self._last_processed_frame, 1)
+        self._last_processed_frame = self.frames
+
+        # Notify observers
+        self.notify()
+        self.update_stride(time.time() - start_time)
+        # Headless: no windows, no waitKey, stopping is done by stop/timeout
+        if self.headless:
+            return self.stopped
+        # Display windows if set to true
+        if self.display and self.frame is not None:
+            self.cv2.imshow("Video", self.frame)
+        # Pressing Esc key to stop
+        key = cv2.waitKey(1)
+        if key == 27:
+            self.stop()
+        return self.stopped
+
+    def frame_due(self, frame_number) -> bool:
+        """
+        Checks if frame should be processed based on the current stride.
+        :param frame_number: int -> Number of frame
+        :return: bool
+        """
+        if self._last_processed_frame is None:
+            return True
+        return frame_number - self._last_processed_frame >= self.stride
+
+    def update_stride(self, latency) -> None:
+        """
+        Updates the moving average processing time of a frame, if adaptive_stride is set raises the stride when
+        processing can't keep up with the fps of video and lowers it when it can.
+        :param latency: float -> Seconds the last frame took to process
+        :return: None
+        """
+        if self.processing_latency is None:
+            self.processing_latency = latency
+        else:
+            self.processing_latency = 0.9 * self.processing_latency + 0.1 * latency
+        if not self.adaptive_stride or not self.fps:
+            return
+        max_stride = self.max_stride if self.max_stride is not None else max(self.fps, self.frame_stride)
+        # Number of frames that pass while one frame gets processed
+        stride = int(math.ceil(self.processing_latency * self.fps))
+        self.stride = min(max(stride, self.frame_stride), max_stride)
+
+    def open_source(self, video_path):
+        """
+        Opens video_path as a StreamSource, live streams get reconnected with backoff when reading fails.
+        :param video_path: str or int
+        :return: StreamSource
+        """
+        return StreamSource(video_path, live=self.is_live(video_path), fps=self.fps,
+                            reconnect_delay=self.reconnect_delay, max_reconnect_delay=self.max_reconnect_delay,
+                            max_reconnects=self.max_reconnects, stop_event=self._stop_event,
+                            start_timestamp=self.start_timestamp)
+
+    @staticmethod
+    def is_live(video_path) -> bool:
+        """
+        Checks if video path is a live stream(camera index or stream url) and not a video file.
+        :param video_path: str or int
+        :return: bool
+        """
+        return isinstance(video_path, int) or not os.path.isfile(video_path)
 
     def set_fps(self):
         """
@@ -269,9 +661,13 @@ class VideoPlayer(Subject):
         :return: None
         """
         for video_path in self.video_list:
-            cap = self.cv2.VideoCapture(video_path)
+            cap = self.open_source(video_path)
+            self.source = cap
             # Get first frames to extract size
-            _, self.frame = cap.read()
+            self.ret, self.frame = cap.read()
+            if not self.ret:  # Could not be opened or stopped while connecting
+                cap.release()
+                continue
             self.frame = self.cv2.resize(self.frame, self.resize, fx=0, fy=0, interpolation=cv2.INTER_CUBIC)
             height, width, _ = self.frame.shape
 
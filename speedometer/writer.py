@@ -0,0 +1,174 @@
+"""
+File consists of the MeasurementWriter class, which writes rows of measured data to a sink(csv file, SQLite database,
+...) on its own thread, so slow storage(SD card of a Raspberry Pi, network drive, ...) never blocks processing of frames.
+"""
+from speedometer.sinks import Sink, CsvSink
+import collections
+import threading
+import time
+
+
+class MeasurementWriter:
+    """
+    MeasurementWriter keeps written rows in a bounded in-memory queue, a background thread saves them to the sink in
+    batches. A batch gets written once batch_size rows are queued or flush_interval seconds passed since the last write,
+    rows left in the queue are written when the writer gets closed. The sink is kept open between batches.
+    Possible policies when the queue is full:
+        - "block": write waits until the thread makes space in queue, no row is lost.
+        - "drop_oldest": oldest queued row is dropped, processing never waits.
+        - "drop_newest": written row is dropped, processing never waits.
+    Possible fsync policies(writing data from the OS cache to storage):
+        - None: never, left to the OS.
+        - "batch": after every written batch, safest but slowest and wears SD cards the most.
+        - "close": once when the writer gets closed.
+    """
+    policies = ("block", "drop_oldest", "drop_newest")
+    fsync_policies = (None, "batch", "close")
+
+    def __init__(self, sink, batch_size=50, flush_interval=5.0, max_queue=10000, overflow="block", fsync="close"):
+        """
+        :param sink: Sink or str -> Sink rows get saved to(see sinks), a str is the name of a csv file(CsvSink)
+        :param batch_size: int -> Number of queued rows that get written at once. Preset: 50
+        :param flush_interval: float -> Maximum seconds a row waits in queue before it is written. Preset: 5.0
+        :param max_queue: int -> Maximum number of rows waiting in queue. Preset: 10000
+        :param overflow: str -> What happens when queue is full, possible: "block"(preset), "drop_oldest",
+        "drop_newest"
+        :param fsync: str -> When written data gets synced to storage, possible: None, "batch", "close"(preset)
+        """
+        if overflow not in self.policies:
+            raise ValueError("Overflow policy set incorrectly. Should be one of: {}".format(", ".join(self.policies)))
+        if fsync not in self.fsync_policies:
+            raise ValueError("Fsync policy set incorrectly. Should be one of: None, batch, close")
+        if batch_size < 1 or max_queue < 1:
+            raise ValueError("Batch size and maximum queue size should be at least 1.")
+        self.sink = sink if isinstance(sink, Sink) else CsvSink(sink)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.fsync = fsync
+        self._queue = collections.deque()  # Rows waiting to be written
+        self._condition = threading.Condition()
+        self._closed = False
+        self._flush_requested = False
+        self._writing = False  # Set while the thread writes a batch outside of the lock
+        # Counters
+        self.written_rows = 0
+        self.dropped_rows = 0
+        self.error = None  # Last error of writing, writing is retried with the next batch
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def queued_rows(self) -> int:
+        """
+        Number of rows currently waiting in queue.
+        """
+        with self._condition:
+            return len(self._queue)
+
+    def write(self, row) -> None:
+        """
+        Queues a row to be written, only waits if queue is full and overflow is "block".
+        :param row: list or tuple -> Values of row
+        :return: None
+        """
+        with self._condition:
+            if self._closed:
+                raise ValueError("Writer of {} is closed.".format(self.sink))
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == "block":
+                    self._condition.wait_for(lambda: len(self._queue) < self.max_queue)
+                elif self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped_rows += 1
+                else:  # drop_newest
+                    self.dropped_rows += 1
+                    return
+            self._queue.append(list(row))
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+
+    def flush(self, timeout=None) -> bool:
+        """
+        Wakes the thread to write all queued rows and waits until they are written.
+        :param timeout: float -> Maximum number of seconds to wait, waits forever if None.
+        :return: bool -> True if the queue got written
+        """
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: not self._queue and not self._writing, timeout)
+
+    def close(self) -> None:
+        """
+        Writes all queued rows, syncs the file if fsync is set and stops the thread. Can be called more than once.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self) -> None:
+        """
+        Writer thread, writes batches until closed and the queue is empty.
+        """
+        last_write = time.monotonic()
+        while True:
+            with self._condition:
+                # Wait for a full batch, the flush interval, flush or close
+                if not self._condition.wait_for(lambda: self._batch_due(last_write), timeout=self.flush_interval):
+                    continue
+                if not self._queue:  # Closed
+                    break
+                rows = list(self._queue)
+                self._queue.clear()
+                self._flush_requested = False
+                self._writing = True
+                self._condition.notify_all()  # Wake writers blocking on a full queue
+            self._write_rows(rows)
+            last_write = time.monotonic()
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+        self._close_sink()
+
+    def _batch_due(self, last_write) -> bool:
+        if self._closed:
+            return True
+        if not self._queue:
+            return False
+        return len(self._queue) >= self.batch_size or self._flush_requested or \
+            time.monotonic() - last_write >= self.flush_interval
+
+    def _write_rows(self, rows) -> None:
+        """
+        Saves rows to sink, on failure rows are put back to the front of queue(within max_queue).
+        """
+        try:
+            self.sink.write(rows)
+            if self.fsync == "batch":
+                self.sink.sync()
+            self.written_rows += len(rows)
+            self.error = None
+        except self.sink.errors as error:
+            self.error = error
+            print("WARNING: Writing to {} failed: {}".format(self.sink, error))
+            with self._condition:
+                if self._closed:  # Nothing will retry writing
+                    self.dropped_rows += len(rows)
+                    return
+                space = self.max_queue - len(self._queue)
+                self._queue.extendleft(reversed(rows[-space:] if space > 0 else []))
+                self.dropped_rows += len(rows) - max(space, 0)
+            time.sleep(min(self.flush_interval, 1))
+
+    def _close_sink(self) -> None:
+        try:
+            if self.fsync == "close":
+                self.sink.sync()
+            self.sink.close()
+        except self.sink.errors as error:
+            self.error = error
+            print("WARNING: Closing {} failed: {}".format(self.sink, error))